@@ -0,0 +1,4 @@
+"""
+End-to-end benchmarks of process_jobs on synthetic Remotive-shaped corpora.
+The Remotive API is replaced by a local stub server and Google Sheets by an in-memory fake.
+"""
@@ -0,0 +1,36 @@
+import sys
+import argparse
+from benchmarks.runner import run
+from benchmarks.compare import compare_files
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the job tracker pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run process_jobs on synthetic corpora and write a JSON report")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Corpus sizes (jobs)")
+    run_parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    run_parser.add_argument("--churn", type=float, default=0.05, help="Share of postings replaced for the incremental run")
+    run_parser.add_argument("--nlp-model", help="spaCy model to load instead of config.NLP_MODEL")
+    run_parser.add_argument("--stream", action="store_true", help="Benchmark the chunked streaming pipeline")
+    run_parser.add_argument("--chunk-size", type=int, help="Jobs per chunk in streaming mode")
+    run_parser.add_argument("--workers", type=int, help="Annotation worker processes (0 = one per CPU core)")
+    run_parser.add_argument("--engine", help="Ranking engine instead of config.RANKING_ENGINE (tfidf, bm25, semantic)")
+    run_parser.add_argument("--output", default="benchmark_results.json", help="Report file")
+    run_parser.add_argument("--keep-work-dirs", action="store_true", help="Keep each run's data and logs directories")
+
+    compare_parser = commands.add_parser("compare", help="Compare two reports and flag regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown flagged as a regression")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "run":
+        run(args.sizes, seed=args.seed, churn_fraction=args.churn, nlp_model=args.nlp_model,
+            output=args.output, keep_work_dirs=args.keep_work_dirs, stream=args.stream, chunk_size=args.chunk_size,
+            workers=args.workers, engine=args.engine)
+    else:
+        sys.exit(0 if compare_files(args.baseline, args.current, threshold=args.threshold) else 1)
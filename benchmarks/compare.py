@@ -0,0 +1,67 @@
+import json
+
+# Changes smaller than these are treated as noise whatever the relative change
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA_MB = 5.0
+
+
+def _metrics(run):
+    """Flattens one size's result into {(scenario, metric): value} with lower-is-better values."""
+    metrics = {}
+    for scenario, result in run["scenarios"].items():
+        metrics[(scenario, "total.seconds")] = result["seconds"]
+        metrics[(scenario, "peak_rss_mb")] = result["peak_rss_mb"]
+        for stage, record in result["stages"].items():
+            metrics[(scenario, f"{stage}.seconds")] = record["seconds"]
+    return metrics
+
+def compare_reports(baseline, current, threshold=0.10):
+    """
+    Compares two benchmark reports size by size.
+    Returns rows (size, scenario, metric, baseline, current, change) and the subset that regressed:
+    slower / bigger by more than `threshold` (relative) and by more than the noise floor.
+    """
+    baseline_runs = {run["size"]: run for run in baseline["runs"]}
+    rows, regressions = [], []
+
+    for run in current["runs"]:
+        base_run = baseline_runs.get(run["size"])
+        if base_run is None:
+            continue
+        base_metrics = _metrics(base_run)
+        for key, value in _metrics(run).items():
+            base_value = base_metrics.get(key)
+            if base_value is None or value is None:
+                continue
+
+            scenario, metric = key
+            change = (value - base_value) / base_value if base_value else 0.0
+            row = (run["size"], scenario, metric, base_value, value, change)
+            rows.append(row)
+
+            noise_floor = MIN_RSS_DELTA_MB if metric == "peak_rss_mb" else MIN_SECONDS_DELTA
+            if change > threshold and value - base_value > noise_floor:
+                regressions.append(row)
+
+    return rows, regressions
+
+def compare_files(baseline_path, current_path, threshold=0.10):
+    """Prints a comparison table of two report files. Returns True when nothing regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows, regressions = compare_reports(baseline, current, threshold)
+    print(f"Baseline {baseline.get('git_commit')} ({baseline['created']}) vs current {current.get('git_commit')} ({current['created']})")
+    print(f"{'size':>8}  {'scenario':<12} {'metric':<30} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in rows:
+        size, scenario, metric, base_value, value, change = row
+        flag = "  REGRESSION" if row in regressions else ""
+        print(f"{size:>8}  {scenario:<12} {metric:<30} {base_value:>10.3f} {value:>10.3f} {change:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} regressions above {threshold:.0%}.")
+    else:
+        print("No regressions.")
+    return not regressions
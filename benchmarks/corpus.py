@@ -0,0 +1,102 @@
+import random
+from datetime import datetime, timedelta
+
+# Vocabulary of the synthetic postings (kept close to what Remotive actually serves)
+TITLES = [
+    "Product Manager", "Senior Project Manager", "Technical Program Manager", "Scrum Master",
+    "Agile Coach", "Program Manager", "Software Engineer", "Senior Backend Engineer",
+    "Full Stack Engineer", "DevOps Engineer", "QA Automation Engineer", "Data Engineer",
+    "Marketing Manager", "Sales Development Representative", "Customer Support Specialist",
+    "Finance Analyst", "UX Designer", "Engineering Manager", "Technical Product Manager"
+]
+CATEGORIES = [
+    "Software Development", "Product", "Project Management", "DevOps / Sysadmin", "QA",
+    "Data", "Marketing", "Sales", "Customer Service", "Finance / Legal", "Design"
+]
+JOB_TYPES = ["full_time", "contract", "part_time", "freelance"]
+LOCATIONS = ["Worldwide", "USA", "Europe", "UK", "Canada", "Americas", "EMEA", "Germany", "LATAM"]
+SKILLS = [
+    "Python", "Java", "C++", "SQL", "AWS", "Azure", "Jira", "Agile", "Scrum", "Kanban",
+    "Project Management", "Stakeholder Management", "Sprint Planning", "Backlog Grooming",
+    "Risk Mitigation", "Process Optimization", "Cloud Computing", "Data Validation",
+    "Software Development", "Technical Product Management", "Kubernetes", "Terraform",
+    "React", "TypeScript", "Go", "PostgreSQL", "Confluence", "OKRs", "Roadmapping"
+]
+FILLER = [
+    "We are a fully remote team building tools that help thousands of companies ship faster.",
+    "You will work closely with engineering, design and customer success to deliver results.",
+    "Our culture values ownership, clear written communication and continuous improvement.",
+    "This role reports to the VP of Engineering and partners with leadership across the business.",
+    "You will own the delivery of cross-functional initiatives from discovery to launch.",
+    "We offer flexible hours, a home office budget and generous paid time off.",
+    "Help us scale our platform while keeping quality and reliability at the core.",
+    "You thrive in ambiguity and enjoy turning complex problems into simple plans.",
+    "Collaboration with distributed teams across several time zones is part of the job.",
+    "Experience in a fast-growing startup environment is a strong plus."
+]
+BENEFITS = [
+    "Competitive salary and equity", "Health, dental and vision insurance", "Annual team retreats",
+    "Learning and development budget", "Home office stipend", "Parental leave", "Unlimited PTO"
+]
+
+
+def _description(rng, title, company):
+    """Remotive-style HTML body: paragraphs, bold headings, lists, links and the odd inline style."""
+    skills = rng.sample(SKILLS, rng.randint(3, 9))
+    paragraphs = rng.sample(FILLER, rng.randint(3, 7))
+    parts = [
+        f"<p><strong>{company}</strong> is hiring a <em>{title}</em>.</p>",
+        "".join(f"<p>{text}</p>" for text in paragraphs),
+        "<p><strong>What you'll do</strong></p><ul>",
+        "".join(f"<li>Drive {skill.lower()} initiatives &amp; mentor the team</li>" for skill in skills[:3]),
+        "</ul><p><strong>Requirements</strong></p><ul>",
+        "".join(f"<li>{rng.randint(2, 8)}+ years of experience with {skill}</li>" for skill in skills),
+        "</ul><p><strong>Benefits</strong></p><ul>",
+        "".join(f"<li>{benefit}</li>" for benefit in rng.sample(BENEFITS, rng.randint(2, 5))),
+        "</ul>",
+        '<p style="color:#333">Apply via <a href="https://example.com/apply">our careers page</a>.&nbsp;</p>'
+    ]
+    if rng.random() < 0.1:
+        parts.append("<script>window.analytics && analytics.track('view');</script>")
+    return "".join(parts)
+
+def generate_jobs(count, seed=0, start_id=1):
+    """Generates `count` Remotive-shaped job postings, reproducible for a given seed."""
+    rng = random.Random(seed)
+    published = datetime(2025, 1, 1)
+    jobs = []
+    for job_id in range(start_id, start_id + count):
+        title = rng.choice(TITLES)
+        company = f"Company {rng.randint(1, max(10, count // 5))}"
+        jobs.append({
+            "id": job_id,
+            "url": f"https://remotive.com/remote-jobs/bench/{job_id}",
+            "title": title,
+            "company_name": company,
+            "company_logo": f"https://remotive.com/job/{job_id}/logo",
+            "category": rng.choice(CATEGORIES),
+            "tags": rng.sample(SKILLS, 4),
+            "job_type": rng.choice(JOB_TYPES),
+            "publication_date": (published + timedelta(minutes=job_id)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "candidate_required_location": rng.choice(LOCATIONS),
+            "salary": rng.choice(["", "$80k - $120k", "$120k - $160k", "Competitive"]),
+            "description": _description(rng, title, company)
+        })
+    return jobs
+
+def churn(jobs, fraction, seed=1):
+    """
+    Next snapshot of a feed: the oldest `fraction` of postings expire and as many new ones appear.
+    Used to measure an incremental run against a warm job store and caches.
+    """
+    replaced = int(len(jobs) * fraction)
+    next_id = max(job["id"] for job in jobs) + 1 if jobs else 1
+    return jobs[replaced:] + generate_jobs(replaced, seed=seed, start_id=next_id)
+
+def resume_text():
+    """Plain-text resume matching part of the skill vocabulary."""
+    return (
+        "Project Manager with 8 years of experience leading Agile and Scrum teams.\n"
+        "Skills: Jira, Stakeholder Management, Sprint Planning, Backlog Grooming, AWS, Python, SQL.\n"
+        "Delivered Cloud Computing migrations and Software Development programs for remote teams."
+    )
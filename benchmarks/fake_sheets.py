@@ -0,0 +1,102 @@
+import threading
+import gspread
+from gspread.utils import a1_to_rowcol
+
+
+class FakeWorksheet:
+    """In-memory worksheet implementing the gspread calls the writer makes."""
+
+    def __init__(self, spreadsheet, title, rows=1000):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.row_count = rows
+        self.cells = {}  # (row, col) -> value
+
+    def col_values(self, col):
+        self.spreadsheet.count("col_values")
+        rows = [row for row, c in self.cells if c == col]
+        if not rows:
+            return []
+        return [self.cells.get((row, col), "") for row in range(1, max(rows) + 1)]
+
+    def get(self, a1_range):
+        self.spreadsheet.count("get")
+        (first_row, first_col), (last_row, last_col) = (a1_to_rowcol(cell) for cell in a1_range.split(":"))
+        return [
+            [self.cells.get((row, col), "") for col in range(first_col, last_col + 1)]
+            for row in range(first_row, last_row + 1)
+        ]
+
+    def add_rows(self, rows):
+        self.spreadsheet.count("add_rows")
+        self.row_count += rows
+
+    def row_values(self, row):
+        cols = [c for r, c in self.cells if r == row]
+        return [self.cells.get((row, col), "") for col in range(1, max(cols) + 1)] if cols else []
+
+
+class FakeSpreadsheet:
+    """In-memory spreadsheet: worksheet lookup plus values_batch_update over A1 ranges."""
+
+    def __init__(self, worksheet_names, spreadsheet_id="benchmark"):
+        self.id = spreadsheet_id
+        self.calls = {}
+        self.cells_written = 0
+        self._lock = threading.Lock()
+        self._worksheets = {name: FakeWorksheet(self, name) for name in worksheet_names}
+
+    def count(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    def worksheet(self, name):
+        self.count("worksheet")
+        if name not in self._worksheets:
+            raise gspread.WorksheetNotFound(name)
+        return self._worksheets[name]
+
+    def add_worksheet(self, title, rows, cols):
+        self.count("add_worksheet")
+        with self._lock:
+            self._worksheets[title] = FakeWorksheet(self, title, rows)
+            return self._worksheets[title]
+
+    def values_batch_update(self, body):
+        self.count("values_batch_update")
+        with self._lock:
+            for item in body["data"]:
+                sheet_name, a1_range = item["range"].rsplit("!", 1)
+                first_row, first_col = a1_to_rowcol(a1_range.split(":")[0])
+                worksheet = self._worksheets[sheet_name.strip("'")]
+                for row_offset, values in enumerate(item["values"]):
+                    for col_offset, value in enumerate(values):
+                        worksheet.cells[(first_row + row_offset, first_col + col_offset)] = value
+                        self.cells_written += 1
+        return {"totalUpdatedCells": self.cells_written}
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "cells_written": self.cells_written}
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = {}
+            self.cells_written = 0
+
+
+class FakeSheetsSession:
+    """Drop-in for job_writer.SheetsSession backed by a FakeSpreadsheet (no credentials needed)."""
+
+    def __init__(self, worksheet_names):
+        self.spreadsheet = FakeSpreadsheet(worksheet_names)
+
+    def worksheet(self, name, headers=None):
+        try:
+            return self.spreadsheet.worksheet(name)
+        except gspread.WorksheetNotFound:
+            if headers is None:
+                raise
+            worksheet = self.spreadsheet.add_worksheet(name, 1000, len(headers))
+            self.spreadsheet.values_batch_update({"data": [{"range": f"'{name}'!A1", "values": [headers]}]})
+            return worksheet
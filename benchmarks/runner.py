@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "src")
+
+
+def _stage_report(stages):
+    """The run record's stages (every span the pipeline opened) with items/sec added."""
+    for stage in stages.values():
+        stage["items_per_sec"] = round(stage["items"] / stage["seconds"], 1) if stage["seconds"] else None
+    return stages
+
+def _write_resume(path):
+    import docx
+    from benchmarks.corpus import resume_text
+
+    document = docx.Document()
+    for line in resume_text().splitlines():
+        document.add_paragraph(line)
+    document.save(path)
+
+def run_single(size, seed, churn_fraction, work_dir, nlp_model=None, stream=False, chunk_size=None, workers=None,
+               engine=None):
+    """
+    Benchmarks one corpus size inside this process (call in a fresh interpreter).
+    Scenarios: cold (empty store and caches), incremental (churned feed) and unchanged (304).
+    """
+    # Point the tracker at throwaway data/logs directories before config is imported
+    os.environ["JOB_TRACKER_DATA_DIR"] = os.path.join(work_dir, "data")
+    os.environ["JOB_TRACKER_LOGS_DIR"] = os.path.join(work_dir, "logs")
+    os.environ.setdefault("SPREADSHEET_ID", "benchmark")
+    sys.path.insert(0, SRC_DIR)
+
+    import config
+    import job_writer
+    import job_processor
+    from benchmarks.corpus import generate_jobs, churn
+    from benchmarks.stub_remotive import StubRemotive
+    from benchmarks.fake_sheets import FakeSheetsSession
+
+    if nlp_model:
+        config.NLP_MODEL = nlp_model
+    if stream:
+        config.STREAMING_PIPELINE = True
+    if chunk_size:
+        config.PIPELINE_CHUNK_SIZE = chunk_size
+    if workers is not None:
+        config.SCORING_WORKERS = workers
+    if engine:
+        config.RANKING_ENGINE = engine
+    # Stages, counters and peak RSS come from the run record metrics.finish_run() produces
+    config.METRICS_ENABLED = True
+    _write_resume(config.RESUME_FILE)
+
+    session = FakeSheetsSession([config.JOB_POOL_SHEET_NAME, config.RECOMMENDED_JOBS_SHEET_NAME])
+    job_writer._sheets_session = session
+
+    jobs = generate_jobs(size, seed=seed)
+    scenarios = {}
+    with StubRemotive(jobs) as stub:
+        config.REMOTIVE_URL = stub.url
+        feeds = [("cold", jobs), ("incremental", churn(jobs, churn_fraction, seed=seed + 1)), ("unchanged", None)]
+
+        for scenario, feed in feeds:
+            if feed is not None:
+                stub.set_jobs(feed)
+            session.spreadsheet.reset_stats()
+            stub_before = stub.stats()
+
+            start = time.perf_counter()
+            record = job_processor.process_jobs()
+            total = time.perf_counter() - start
+
+            stub_after = stub.stats()
+            scenarios[scenario] = {
+                "seconds": round(total, 4),
+                "feed_jobs": size,
+                "jobs_per_sec": round(size / total, 1) if total else None,
+                "peak_rss_mb": record["peak_rss_mb"],
+                "stages": _stage_report(record["stages"]),
+                "http": {key: stub_after[key] - stub_before[key] for key in stub_after},
+                "sheets": session.spreadsheet.stats(),
+                "counters": record["counters"]
+            }
+
+    return {
+        "size": size, "seed": seed, "churn": churn_fraction, "nlp_model": config.NLP_MODEL,
+        "streaming": config.STREAMING_PIPELINE, "chunk_size": config.PIPELINE_CHUNK_SIZE,
+        "workers": config.SCORING_WORKERS, "engine": config.RANKING_ENGINE, "scenarios": scenarios
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes, seed=0, churn_fraction=0.05, nlp_model=None, output=None, keep_work_dirs=False, stream=False,
+        chunk_size=None, workers=None, engine=None):
+    """
+    Benchmarks every corpus size in its own interpreter (clean caches, honest peak RSS).
+    Writes and returns the combined JSON report.
+    """
+    report = {
+        "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "runs": []
+    }
+
+    for size in sizes:
+        work_dir = tempfile.mkdtemp(prefix=f"job_tracker_bench_{size}_")
+        result_file = os.path.join(work_dir, "result.json")
+        command = [
+            sys.executable, "-m", "benchmarks.runner", "--size", str(size), "--seed", str(seed),
+            "--churn", str(churn_fraction), "--work-dir", work_dir, "--result-file", result_file
+        ]
+        if nlp_model:
+            command += ["--nlp-model", nlp_model]
+        if stream:
+            command.append("--stream")
+        if chunk_size:
+            command += ["--chunk-size", str(chunk_size)]
+        if workers is not None:
+            command += ["--workers", str(workers)]
+        if engine:
+            command += ["--engine", engine]
+
+        print(f"Benchmarking {size} jobs in {work_dir}...")
+        try:
+            subprocess.run(command, cwd=REPO_ROOT, check=True)
+            with open(result_file, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        finally:
+            if not keep_work_dirs:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        cold = result["scenarios"]["cold"]
+        print(f"{size} jobs: cold {cold['seconds']:.2f} sec ({cold['jobs_per_sec']} jobs/sec), peak RSS {cold['peak_rss_mb']} MB")
+        report["runs"].append(result)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark report written to {output}")
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark a single corpus size (used by `python -m benchmarks run`).")
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--churn", type=float, default=0.05)
+    parser.add_argument("--work-dir", required=True)
+    parser.add_argument("--result-file", required=True)
+    parser.add_argument("--nlp-model")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--engine")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run_single(
+        args.size, args.seed, args.churn, args.work_dir,
+        nlp_model=args.nlp_model, stream=args.stream, chunk_size=args.chunk_size, workers=args.workers,
+        engine=args.engine
+    )
+    with open(args.result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f)
@@ -0,0 +1,96 @@
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PATH = "/api/remote-jobs"
+
+
+class _RemotiveHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        if self.path.split("?", 1)[0] != API_PATH:
+            self.send_error(404)
+            return
+
+        with server.lock:
+            body, etag, status = server.body, server.etag, server.status
+            server.requests += 1
+
+        # Simulated outage (e.g. 503 from the API's CDN)
+        if status is not None:
+            self.send_error(status)
+            return
+
+        # Honour conditional GETs the way the real API's CDN does
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+        with server.lock:
+            server.bytes_sent += len(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+class StubRemotive:
+    """
+    Local stand-in for the Remotive API serving a fixed job list (with ETag / 304 support).
+    - set_status() makes it answer every request with an error status until it is reset to None.
+    Usable as a context manager; `url` goes into config.REMOTIVE_URL.
+    """
+
+    def __init__(self, jobs, host="127.0.0.1", port=0):
+        self._server = ThreadingHTTPServer((host, port), _RemotiveHandler)
+        self._server.daemon_threads = True
+        self._server.lock = threading.Lock()
+        self._server.requests = 0
+        self._server.bytes_sent = 0
+        self._server.status = None
+        self.set_jobs(jobs)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-remotive", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def set_jobs(self, jobs):
+        """Replaces the served feed (a new body gets a new ETag)."""
+        body = json.dumps({"0-legal-notice": "Benchmark stub", "job-count": len(jobs), "jobs": jobs}).encode("utf-8")
+        with self._server.lock:
+            self._server.body = body
+            self._server.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+    def set_status(self, status):
+        """Answers every request with this HTTP error status (None serves the feed again)."""
+        with self._server.lock:
+            self._server.status = status
+
+    def stats(self):
+        with self._server.lock:
+            return {"requests": self._server.requests, "bytes_sent": self._server.bytes_sent}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -1,10 +1,11 @@
 @echo off
+:: Starts the tracker in daemon mode (it polls every config.DAEMON_POLL_INTERVAL seconds itself)
+:: and restarts it after a minute if it ever exits.
 :loop
-echo [INFO] Running Job Tracker at %TIME% on %DATE% >> job_tracker_log.txt
-python "C:\Users\anugy\PERSONAL PROJECTS\Job Application Tracker AI\job_tracker.py"
-echo [INFO] Job Tracker completed at %TIME% on %DATE% >> job_tracker_log.txt
+echo [INFO] Starting Job Tracker daemon at %TIME% on %DATE% >> job_tracker_log.txt
+python "%~dp0src\job_processor.py" --daemon
+echo [INFO] Job Tracker daemon exited at %TIME% on %DATE% >> job_tracker_log.txt
 
-:: Corrected timeout (8 hours)
-timeout /t 28800 /nobreak >nul
+timeout /t 60 /nobreak >nul
 
 goto loop
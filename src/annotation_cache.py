@@ -0,0 +1,115 @@
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+import config
+from logger import setup_logger
+
+logger = setup_logger("annotation_cache")
+
+# Bump when the stored annotation format changes so old entries are never reused
+ANNOTATION_VERSION = 2
+
+_cache = None
+
+
+def annotation_key(text, model_id):
+    """
+    Content address of a description's annotation: hash of the text plus model name/version and
+    the excluded pipeline components (re-enabling one must not serve annotations made without it).
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    excluded = ",".join(sorted(config.NLP_EXCLUDED_PIPES))
+    return f"{model_id}:v{ANNOTATION_VERSION}:x[{excluded}]:{digest}"
+
+
+class AnnotationCache:
+    """
+    SQLite cache of NLP annotations keyed by annotation_key().
+    - Unchanged postings are served from disk and skip spaCy completely.
+    - Least recently used entries are evicted once the cache grows past max_entries.
+    """
+
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or config.ANNOTATION_CACHE_FILE
+        self.max_entries = max_entries or config.ANNOTATION_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS annotations ("
+            "key TEXT PRIMARY KEY, annotation TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_annotations_last_used ON annotations (last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Returns {key: annotation} for the keys found in the cache and counts hits/misses."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, annotation FROM annotations WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update((key, json.loads(annotation)) for key, annotation in rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE annotations SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, annotations):
+        """Stores {key: annotation} and evicts the least recently used entries beyond max_entries."""
+        if not annotations:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO annotations (key, annotation, last_used) VALUES (?, ?, ?)",
+                [(key, json.dumps(annotation), now) for key, annotation in annotations.items()]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Deletes the oldest entries so the cache holds at most max_entries rows."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM annotations").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM annotations WHERE key IN (SELECT key FROM annotations ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            logger.info(f"Evicted {excess} annotations from the cache.")
+
+    def stats(self):
+        """Hit/miss counters since the last reset."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        hit_rate = hits / lookups if lookups else 0.0
+        return {"hits": hits, "misses": misses, "hit_rate": hit_rate}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def get_annotation_cache():
+    """Returns the process-wide annotation cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = AnnotationCache()
+    return _cache
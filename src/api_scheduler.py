@@ -0,0 +1,176 @@
+import time
+import random
+import threading
+import config
+from job_sources import TokenBucket
+from metrics import count
+from logger import setup_logger
+
+logger = setup_logger("api_scheduler")
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _status_code(error):
+    """Best-effort HTTP status of a gspread APIError or googleapiclient HttpError."""
+    # A requests.Response is falsy for error statuses, so compare against None explicitly
+    response = getattr(error, "response", None)
+    if response is None:
+        response = getattr(error, "resp", None)
+    for value in (getattr(error, "code", None), getattr(response, "status_code", None), getattr(response, "status", None)):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def is_retryable(error):
+    """True for quota / rate-limit errors and transient server errors."""
+    status = _status_code(error)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    message = str(error).lower()
+    return status == 403 and ("ratelimitexceeded" in message or "quota" in message)
+
+
+class _PendingWrite:
+    def __init__(self, data):
+        self.data = data
+        self.done = threading.Event()
+        self.error = None
+
+
+class RequestScheduler:
+    """
+    Meters calls to one Google API quota (e.g. Sheets writes) against a per-minute budget.
+    - call() waits for a quota slot, then retries quota and transient errors with jittered exponential backoff.
+    - values_batch_update() coalesces value writes queued while waiting into a single request.
+    - stats() reports calls, retries, queue depth and time spent throttled.
+    """
+
+    def __init__(self, name, requests_per_minute):
+        self.name = name
+        self._bucket = TokenBucket(requests_per_minute / 60.0, max(1, requests_per_minute // 6))
+        self._lock = threading.Lock()
+        self._send_locks = {}
+        self._pending = {}
+        self.queue_depth = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Starts a new reporting window; queue_depth counts live callers, so only its peak is reset."""
+        with self._lock:
+            self.calls = 0
+            self.retries = 0
+            self.coalesced = 0
+            self.throttle_seconds = 0.0
+            self.max_queue_depth = self.queue_depth
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "coalesced_writes": self.coalesced,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth
+        }
+
+    def _enter_queue(self):
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def _leave_queue(self):
+        with self._lock:
+            self.queue_depth -= 1
+
+    def _execute(self, fn, args=(), kwargs=None, prepaid=False):
+        """
+        Runs fn within the budget, retrying retryable errors with full-jitter backoff.
+        - prepaid means the caller already took the quota slot for the first attempt.
+        """
+        for attempt in range(config.GOOGLE_API_MAX_RETRIES + 1):
+            waited = 0.0 if prepaid and attempt == 0 else self._bucket.acquire()
+            with self._lock:
+                self.throttle_seconds += waited
+                self.calls += 1
+            count(f"api_calls.{self.name}")
+            try:
+                return fn(*args, **(kwargs or {}))
+            except Exception as e:
+                if attempt == config.GOOGLE_API_MAX_RETRIES or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(config.GOOGLE_API_MAX_BACKOFF, config.GOOGLE_API_BASE_BACKOFF * 2 ** attempt))
+                logger.warning(f"{self.name}: {e} - retrying in {delay:.1f} sec (attempt {attempt + 1})")
+                with self._lock:
+                    self.retries += 1
+                    self.throttle_seconds += delay
+                time.sleep(delay)
+
+    def call(self, fn, *args, **kwargs):
+        """Calls fn(*args, **kwargs) once a quota slot is free, retrying quota errors."""
+        self._enter_queue()
+        try:
+            return self._execute(fn, args, kwargs)
+        finally:
+            self._leave_queue()
+
+    def values_batch_update(self, spreadsheet, data, value_input_option="RAW"):
+        """
+        Queues value ranges for spreadsheet.values_batch_update.
+        Whichever caller gets the next quota slot sends every range queued so far in one request.
+        """
+        key = (spreadsheet.id, value_input_option)
+        ticket = _PendingWrite(data)
+        self._enter_queue()
+        try:
+            with self._lock:
+                self._pending.setdefault(key, []).append(ticket)
+                send_lock = self._send_locks.setdefault(key, threading.Lock())
+
+            with send_lock:
+                if not ticket.done.is_set():
+                    # Waiting for the quota slot first lets concurrent writers pile into this request
+                    waited = self._bucket.acquire()
+                    with self._lock:
+                        self.throttle_seconds += waited
+                        batch, self._pending[key] = self._pending[key], []
+                        self.coalesced += len(batch) - 1
+
+                    body = {"valueInputOption": value_input_option, "data": [item for t in batch for item in t.data]}
+                    try:
+                        self._execute(spreadsheet.values_batch_update, kwargs={"body": body}, prepaid=True)
+                    except Exception as e:
+                        for t in batch:
+                            t.error = e
+                    finally:
+                        for t in batch:
+                            t.done.set()
+        finally:
+            self._leave_queue()
+
+        if ticket.error is not None:
+            raise ticket.error
+
+
+def get_scheduler(name):
+    """Returns the shared scheduler of a quota named in config.GOOGLE_API_BUDGETS."""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            _schedulers[name] = RequestScheduler(name, config.GOOGLE_API_BUDGETS[name])
+        return _schedulers[name]
+
+def reset_scheduler_stats():
+    """Resets every scheduler's stats, so each pipeline run reports only its own calls."""
+    with _schedulers_lock:
+        for scheduler in _schedulers.values():
+            scheduler.reset_stats()
+
+def all_scheduler_stats():
+    """Stats of every scheduler used so far, keyed by quota name."""
+    with _schedulers_lock:
+        return {name: scheduler.stats() for name, scheduler in _schedulers.items()}
@@ -0,0 +1,273 @@
+import math
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+import config
+from utils import job_text
+from job_store import get_job_store
+from metrics import count
+from logger import setup_logger
+
+logger = setup_logger("bm25_ranker")
+
+_analyzer = CountVectorizer(stop_words="english").build_analyzer()  # Same tokens as the TF-IDF model
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """
+    Persistent inverted index (term -> postings of doc ids and term frequencies) in SQLite, ranked with BM25.
+    - Each add_jobs() call appends one postings segment per term it touches; nothing is rewritten.
+    - Expired or changed jobs are only marked inactive; compact() drops their postings once they pile up.
+    - Document lengths and activity flags live in memory, as do the postings of terms queried before,
+      so scoring is a few vectorized numpy operations per query term.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.BM25_INDEX_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "doc_id INTEGER PRIMARY KEY, url TEXT NOT NULL, length INTEGER NOT NULL, "
+            "text_hash TEXT NOT NULL, active INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_url ON docs (url)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, segment INTEGER NOT NULL, doc_ids BLOB NOT NULL, tfs BLOB NOT NULL, "
+            "PRIMARY KEY (term, segment)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+        rows = self._conn.execute("SELECT doc_id, url, length, text_hash, active FROM docs").fetchall()
+        size = max([doc_id for doc_id, *_ in rows] + [0]) + 1
+        self.lengths = np.zeros(size, dtype=np.float32)
+        self.active = np.zeros(size, dtype=bool)
+        self.doc_of = {}  # url -> (doc_id, text_hash) of the active document
+        self.inactive_docs = 0  # Documents whose postings are still stored but no longer count
+        for doc_id, url, length, text_hash, active in rows:
+            self.lengths[doc_id] = length
+            if active:
+                self.active[doc_id] = True
+                self.doc_of[url] = (doc_id, text_hash)
+            else:
+                self.inactive_docs += 1
+        self.next_doc_id = size
+        (self.segments,) = self._conn.execute("SELECT COUNT(DISTINCT segment) FROM postings").fetchone()
+        (last_segment,) = self._conn.execute("SELECT COALESCE(MAX(segment), 0) FROM postings").fetchone()
+        self.next_segment = last_segment + 1
+        self._postings = {}  # term -> (doc_ids, tfs) of the active documents, loaded on first query
+
+    def __len__(self):
+        return len(self.doc_of)
+
+    def urls(self):
+        return list(self.doc_of)
+
+    def _grow(self, size):
+        if size > len(self.lengths):
+            capacity = max(size, 2 * len(self.lengths))
+            for name in ("lengths", "active"):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:len(column)] = column
+                setattr(self, name, grown)
+
+    def add_jobs(self, jobs):
+        """Indexes new jobs and re-indexes jobs whose description changed. Returns how many were indexed."""
+        with self._lock:
+            docs, retired, term_postings = [], [], {}
+            for job in {job["url"]: job for job in jobs}.values():
+                text = job_text(job)
+                text_hash = _text_hash(text)
+                known = self.doc_of.get(job["url"])
+                if known is not None and known[1] == text_hash:
+                    continue
+                if known is not None:
+                    retired.append(known[0])
+
+                doc_id = self.next_doc_id
+                self.next_doc_id += 1
+                term_counts = Counter(_analyzer(text))
+                docs.append((doc_id, job["url"], sum(term_counts.values()), text_hash))
+                for term, tf in term_counts.items():
+                    ids, tfs = term_postings.setdefault(term, ([], []))
+                    ids.append(doc_id)
+                    tfs.append(tf)
+
+            if not docs:
+                return 0
+
+            segment = self.next_segment
+            self._conn.executemany("UPDATE docs SET active = 0 WHERE doc_id = ?", [(doc_id,) for doc_id in retired])
+            self._conn.executemany(
+                "INSERT INTO docs (doc_id, url, length, text_hash, active) VALUES (?, ?, ?, ?, 1)", docs
+            )
+            self._conn.executemany(
+                "INSERT INTO postings (term, segment, doc_ids, tfs) VALUES (?, ?, ?, ?)",
+                [
+                    (term, segment, np.asarray(ids, dtype=np.int32).tobytes(), np.asarray(tfs, dtype=np.float32).tobytes())
+                    for term, (ids, tfs) in term_postings.items()
+                ]
+            )
+            self._conn.commit()
+
+            self.next_segment += 1
+            self.segments += 1
+            self._grow(self.next_doc_id)
+            self.active[retired] = False
+            self.inactive_docs += len(retired)
+            for doc_id, url, length, text_hash in docs:
+                self.lengths[doc_id] = length
+                self.active[doc_id] = True
+                self.doc_of[url] = (doc_id, text_hash)
+            for term in term_postings:
+                self._postings.pop(term, None)
+            if retired:
+                self._postings = {}
+
+        count("bm25_docs_indexed", len(docs))
+        self._maybe_compact()
+        return len(docs)
+
+    def expire(self, listed_urls):
+        """Deactivates the jobs whose URL is not in listed_urls (postings no feed lists anymore). Returns how many."""
+        with self._lock:
+            expired = [(url, doc_id) for url, (doc_id, _) in self.doc_of.items() if url not in listed_urls]
+            if not expired:
+                return 0
+            self._conn.executemany("UPDATE docs SET active = 0 WHERE doc_id = ?", [(doc_id,) for _, doc_id in expired])
+            self._conn.commit()
+            for url, doc_id in expired:
+                self.active[doc_id] = False
+                del self.doc_of[url]
+            self.inactive_docs += len(expired)
+            self._postings = {}
+        self._maybe_compact()
+        return len(expired)
+
+    def _maybe_compact(self):
+        if self.segments > config.BM25_MAX_SEGMENTS or self.inactive_docs > max(len(self.doc_of), 1000):
+            self.compact()
+
+    def compact(self):
+        """Rewrites the postings as one segment per term, without inactive documents."""
+        with self._lock:
+            logger.info(f"Compacting BM25 index ({self.segments} segments, {len(self.doc_of)} active jobs)...")
+            terms = [term for (term,) in self._conn.execute("SELECT DISTINCT term FROM postings").fetchall()]
+            merged = []
+            for term in terms:
+                ids, tfs = self._load_term(term)
+                live = self.active[ids]
+                if live.any():
+                    merged.append((term, 0, ids[live].tobytes(), tfs[live].tobytes()))
+
+            self._conn.execute("DELETE FROM postings")
+            self._conn.executemany("INSERT INTO postings (term, segment, doc_ids, tfs) VALUES (?, ?, ?, ?)", merged)
+            self._conn.execute("DELETE FROM docs WHERE active = 0")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+            inactive = ~self.active[:self.next_doc_id]
+            self.lengths[:self.next_doc_id][inactive] = 0
+            self.segments = 1 if merged else 0
+            self.inactive_docs = 0
+            self.next_segment = 1
+            self._postings = {}
+
+    def _load_term(self, term):
+        """All postings of a term (every segment, active or not) as (doc_ids, tfs) arrays."""
+        rows = self._conn.execute("SELECT doc_ids, tfs FROM postings WHERE term = ? ORDER BY segment", (term,)).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        return (
+            np.concatenate([np.frombuffer(ids, dtype=np.int32) for ids, _ in rows]),
+            np.concatenate([np.frombuffer(tfs, dtype=np.float32) for _, tfs in rows])
+        )
+
+    def _term_postings(self, term):
+        """Postings of a term restricted to active documents (cached until a job expires or changes)."""
+        if term not in self._postings:
+            ids, tfs = self._load_term(term)
+            live = self.active[ids]
+            self._postings[term] = (ids[live], tfs[live])
+        return self._postings[term]
+
+    def scores(self, query_terms):
+        """
+        BM25 score of every document (indexed by doc id) for a set of query terms, plus its upper bound
+        (the score of a document containing every query term infinitely often), used to normalize it.
+        """
+        k1, b = config.BM25_K1, config.BM25_B
+        with self._lock:
+            n_docs = len(self.doc_of)
+            scores = np.zeros(len(self.lengths), dtype=np.float32)
+            if not n_docs:
+                return scores, 0.0
+            avg_length = float(self.lengths[self.active].mean()) or 1.0
+
+            upper_bound = 0.0
+            for term in query_terms:
+                ids, tfs = self._term_postings(term)
+                if not len(ids):
+                    continue
+                idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = k1 * (1 - b + b * self.lengths[ids] / avg_length)
+                scores[ids] += idf * tfs * (k1 + 1) / (tfs + norm)
+                upper_bound += idf * (k1 + 1)
+        return scores, upper_bound
+
+    def similarities(self, jobs, ideal_text, resume_skills=()):
+        """
+        BM25 similarity in [0, 1) of indexed jobs to the ideal description plus the resume skills
+        (each distinct query term counts once), on the same scale as the TF-IDF cosine.
+        """
+        query_terms = set(_analyzer(ideal_text))
+        for skill in resume_skills:
+            query_terms.update(_analyzer(skill))
+        scores, upper_bound = self.scores(query_terms)
+        if not upper_bound:
+            return np.zeros(len(jobs), dtype=np.float32)
+        doc_ids = np.fromiter((self.doc_of[job["url"]][0] for job in jobs), dtype=np.int64, count=len(jobs))
+        return scores[doc_ids] / upper_bound
+
+
+def get_bm25_index():
+    """Returns the process-wide BM25 index (kept warm across daemon polls)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BM25Index()
+        return _index
+
+def update_bm25_index(job_chunks):
+    """
+    Brings the index in line with the job store before scoring: jobs no feed lists anymore are
+    deactivated, then new or changed jobs from job_chunks (an iterable of job lists) are indexed.
+    """
+    index = get_bm25_index()
+    listed = get_job_store().listed_urls(index.urls())
+    # No feed membership at all (e.g. a store migrated from the JSON cache): nothing can be called expired
+    expired = index.expire(listed) if listed else 0
+    indexed = sum(index.add_jobs(chunk) for chunk in job_chunks)
+    logger.info(f"BM25 index: {indexed} jobs indexed, {expired} expired, {len(index)} active.")
+    return index
+
+def bm25_similarities(jobs, ideal_texts, resume_skill_lists):
+    """jobs x profiles matrix of BM25 similarities (one column per ideal description / resume skills pair)."""
+    index = update_bm25_index([jobs])
+    return np.column_stack([
+        index.similarities(jobs, ideal_text, resume_skills)
+        for ideal_text, resume_skills in zip(ideal_texts, resume_skill_lists)
+    ]).astype(np.float32)
@@ -8,8 +8,8 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 # Subdirectories
 SRC_DIR = os.path.join(BASE_DIR, "src")
 CONFIG_DIR = os.path.join(BASE_DIR, "config")
-LOGS_DIR = os.path.join(BASE_DIR, "logs")
-DATA_DIR = os.path.join(BASE_DIR, "data")
+LOGS_DIR = os.getenv("JOB_TRACKER_LOGS_DIR", os.path.join(BASE_DIR, "logs"))  # Overridable for isolated runs (benchmarks)
+DATA_DIR = os.getenv("JOB_TRACKER_DATA_DIR", os.path.join(BASE_DIR, "data"))
 
 # Log files
 SEND_GMAIL_LOG = os.path.join(LOGS_DIR, "send_gmail.log")
@@ -17,9 +17,44 @@ JOB_TRACKER_LOG = os.path.join(LOGS_DIR, "job_tracker.log")
 JOB_WRITER_LOG = os.path.join(LOGS_DIR, "job_writer.log")
 
 # Cached data
-# File to store cached jobs (prevents duplicate fetches)
+# Job store indexed by URL (prevents duplicate fetches and keeps first/last seen history)
+JOB_STORE_FILE = os.path.join(DATA_DIR, "jobs.sqlite")
+
+# Legacy JSON job cache, imported into the job store on first run
 CACHED_JOBS_FILE = os.path.join(DATA_DIR, "cached_jobs.json")
 
+# Persisted TF-IDF vocabulary and document frequencies, and the per-job term counts (read back per batch)
+TFIDF_MODEL_FILE = os.path.join(DATA_DIR, "tfidf_model.pkl")
+TFIDF_COUNTS_FILE = os.path.join(DATA_DIR, "tfidf_counts.sqlite")
+
+# Content-addressed cache of spaCy annotations (company, job role, skill tokens)
+ANNOTATION_CACHE_FILE = os.path.join(DATA_DIR, "annotation_cache.sqlite")
+ANNOTATION_CACHE_MAX_ENTRIES = 50000  # Least recently used entries are evicted beyond this
+
+# Per-run stage metrics (duration, items, bytes, API calls, peak RSS), one JSON line per run
+METRICS_ENABLED = True
+METRICS_FILE = os.path.join(LOGS_DIR, "metrics.jsonl")
+PROFILE_STAGE = os.getenv("JOB_TRACKER_PROFILE_STAGE")  # Stage run under cProfile (same as --profile-stage)
+
+# Near-duplicate postings (reposts, copies across companies/sources) are collapsed before scoring
+DEDUP_ENABLED = True
+DEDUP_INDEX_FILE = os.path.join(DATA_DIR, "near_duplicates.sqlite")  # MinHash signatures + LSH bands
+DEDUP_THRESHOLD = 0.85  # Estimated Jaccard similarity of word shingles at which a job is a duplicate
+DEDUP_SHINGLE_SIZE = 5  # Words per shingle
+DEDUP_NUM_PERM = 128  # MinHash permutations
+DEDUP_BANDS = 16  # LSH bands (DEDUP_NUM_PERM / DEDUP_BANDS rows each)
+
+# Daemon mode (job_processor.py --daemon): one resident process polling the feeds
+DAEMON_POLL_INTERVAL = 8 * 60 * 60  # Seconds between polls (run_job_tracker.bat used to wait 8 hours)
+DAEMON_POLL_JITTER = 0.1  # Each wait is the interval +/- this fraction
+DAEMON_STATUS_FILE = os.path.join(LOGS_DIR, "daemon_status.json")  # Health/status of the running daemon
+
+# Local read-only query API over the scored jobs (python src/query_api.py)
+QUERY_API_HOST = "127.0.0.1"
+QUERY_API_PORT = 8765
+QUERY_API_REFRESH_INTERVAL = 5  # Seconds between checks for jobs scored by a newer process_jobs run
+QUERY_API_MAX_LIMIT = 500  # Largest page (limit / k) a query may ask for
+
 # Google API credentials
 TOKEN_JSON = os.path.join(DATA_DIR, "token.json")
 TOKEN_PICKLE = os.path.join(DATA_DIR, "token.pickle")
@@ -39,6 +74,19 @@ JOB_POOL_SHEET_NAME = "Job Pool"
 # Name of sheet 2
 RECOMMENDED_JOBS_SHEET_NAME = "Recommended Jobs"
 
+# Local URL -> row index of the synced sheets (avoids reading whole sheets back every run)
+SHEETS_INDEX_FILE = os.path.join(DATA_DIR, "sheets_index.json")
+
+# Google API quotas (requests per minute) and retry policy for quota / transient errors
+GOOGLE_API_BUDGETS = {
+    "sheets_read": 60,
+    "sheets_write": 60,
+    "gmail": 250
+}
+GOOGLE_API_MAX_RETRIES = 6
+GOOGLE_API_BASE_BACKOFF = 2  # Seconds, doubled on every retry (full jitter)
+GOOGLE_API_MAX_BACKOFF = 64
+
 load_dotenv()
 
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
@@ -47,10 +95,29 @@ if not SPREADSHEET_ID:
 
 # Number of top jobs to display in the "Recommended Jobs" sheet
 TOP_N_JOBS = 20  # We can update this number as needed
+LEADERBOARD_FILE = os.path.join(DATA_DIR, "leaderboards.json")  # Persisted top-N per Recommended Jobs sheet
+LEADERBOARD_RESERVE = 20  # Extra jobs kept below the cut so expired ones can be replaced without rescoring
 
 CREDENTIALS_FILE = os.path.join(CONFIG_DIR, "client_secret.json")
 
-REMOTIVE_URL = "https://remotive.io/api/remote-jobs"
+REMOTIVE_URL = os.getenv("REMOTIVE_URL", "https://remotive.io/api/remote-jobs")  # Override to point at a local stub
+
+# HTTP fetch settings
+HTTP_TIMEOUT = (10, 60)  # (connect, read) seconds
+HTTP_POOL_SIZE = 10
+HTTP_CHUNK_SIZE = 64 * 1024  # Bytes read per chunk while streaming the jobs array
+FETCH_UPSERT_BATCH_SIZE = 500  # Streamed jobs written to the job store per batch
+
+# Remotive queries fetched concurrently each run; each dict is sent as query parameters ({} = full feed)
+# e.g. [{"category": "software-dev"}, {"search": "project manager"}]
+REMOTIVE_QUERIES = [{}]
+
+# Multi-source fetch limits
+SOURCE_MAX_WORKERS = 8
+SOURCE_MAX_CONCURRENCY_PER_HOST = 2
+SOURCE_RATE_LIMIT_PER_HOST = 1.0  # Requests per second (token bucket refill rate)
+SOURCE_RATE_BURST = 2  # Requests allowed back to back before the rate limit kicks in
+SOURCE_TIMEOUT = 180  # Seconds allowed per source, including streaming the response
 
 # Ensure all directories exist
 for dir_path in [LOGS_DIR, DATA_DIR, CONFIG_DIR]:
@@ -102,8 +169,36 @@ TECHNICAL_SKILLS = [
     "Software Development", "Technical Product Management"
 ]
 
+# Clean descriptions memoized by content hash (HTML normalization)
+NORMALIZE_CACHE_SIZE = 20000
+
 # Constants for filtering
 MIN_SCORE_THRESHOLD = 20  # Only keep highly relevant jobs
+RELEVANCE_SCORE_THRESHOLD = 3.5  # Jobs scoring above this go to Recommended Jobs
+
+# Streaming pipeline: jobs flow fetch -> vectorize -> score -> write in chunks of this size,
+# so peak memory depends on the chunk size rather than the pool size
+STREAMING_PIPELINE = False
+PIPELINE_CHUNK_SIZE = 1000
+
+# TF-IDF model settings
+TFIDF_MAX_FEATURES = 5000
+TFIDF_REFIT_DRIFT_THRESHOLD = 0.25  # Refit once 25% of newly folded tokens are out of vocabulary
+
+# Ranking engine: "tfidf" (cosine over the persisted TF-IDF model), "bm25" (persistent inverted index)
+# or "semantic" (TF-IDF cosine blended with the word-vector similarity; needs an NLP_MODEL with vectors)
+RANKING_ENGINE = "tfidf"
+BM25_INDEX_FILE = os.path.join(DATA_DIR, "bm25_index.sqlite")
+BM25_K1 = 1.2  # Term frequency saturation
+BM25_B = 0.75  # Document length normalization
+BM25_MAX_SEGMENTS = 32  # Postings segments (one per indexing batch) before the index is compacted
+EMBEDDING_STORE_FILE = os.path.join(DATA_DIR, "job_vectors.f32")  # Job document vectors, memory-mapped float32 rows
+EMBEDDING_INDEX_FILE = os.path.join(DATA_DIR, "job_vectors.sqlite")  # url -> row of EMBEDDING_STORE_FILE
+EMBEDDING_STORE_BLOCK_ROWS = 4096  # The vector file grows by at least this many rows at a time
+# Share of the word-vector similarity in the semantic engine (0 = TF-IDF only, 1 = word vectors only).
+# Word-vector similarities run higher than TF-IDF ones, so raising it may call for a higher threshold.
+SEMANTIC_BLEND_WEIGHT = 0.5
+
 MAX_JOBS_TO_SAVE = 500  # Save a maximum of 500 jobs to Google Sheets
 
 
@@ -111,6 +206,12 @@ RESUME_FILE = os.path.join(DATA_DIR, "resume.docx")  # Change to your actual res
 
 # RESUME_FILE = os.path.join(DATA_DIR, "resume.pdf")
 
+# Parsed resume text and skills, reused until the resume file or skill list changes
+RESUME_CACHE_FILE = os.path.join(DATA_DIR, "resume_cache.json")
+
+# PDFs with more pages than this are extracted in parallel worker processes
+RESUME_PARALLEL_PAGE_THRESHOLD = 20
+
 # Ideal job description (modify based on target job profile)
 IDEAL_JOB_DESC = """
 Project Manager with experience in Agile, Scrum, and Jira. 
@@ -119,6 +220,28 @@ Proficient in backlog grooming, sprint planning, and stakeholder management.
 Looking for remote or hybrid opportunities in product or program management.
 """
 
+# Candidate profiles scored together in one pass (shared fetch, cleaning, TF-IDF and NLP).
+# Empty = the single profile above. Missing keys fall back to IDEAL_JOB_DESC / RESUME_FILE, and each
+# profile gets its own Recommended Jobs tab ("Recommended Jobs - <name>" unless sheet_name is set), e.g.
+# {"name": "pm", "ideal_job_desc": "...", "resume_file": os.path.join(DATA_DIR, "resume_pm.docx")}
+PROFILES = []
+
+# === NLP Settings === #
+NLP_MODEL = "en_core_web_md"  # Medium model for balanced speed & accuracy (shared by all modules)
+
+# Pipeline components the entity extraction never reads (keeps tagger, parser and NER)
+NLP_EXCLUDED_PIPES = ["lemmatizer"]
+
+# Batch size and worker processes used by nlp.pipe during batched extraction
+NLP_BATCH_SIZE = 64
+NLP_N_PROCESS = 1
+
+# Processes annotating job descriptions in parallel (1 = in-process, 0 = one per CPU core)
+SCORING_WORKERS = 1
+
+# Load the model in a background thread while jobs are being fetched
+NLP_PREWARM = True
+
 # Target job titles for prioritization
 TARGET_TITLES = ["product manager", "project manager", "scrum master", "program manager", "technical program manager", "agile coach"]
 
@@ -0,0 +1,96 @@
+import os
+import json
+import random
+import signal
+import threading
+from datetime import datetime, timedelta, timezone
+import config
+from logger import setup_logger
+
+logger = setup_logger("daemon")
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Daemon:
+    """
+    Calls run_once() every poll interval (with jitter) in one long-lived process, so models,
+    the TF-IDF state, the Sheets session and the worker pool stay loaded between polls.
+    - SIGINT / SIGTERM finish the poll in progress and exit; a second signal exits at once.
+    - A failing poll is logged and counted; the daemon keeps polling.
+    - The status file (JSON) tells a health check whether the daemon is alive and when it polls next.
+    """
+
+    def __init__(self, run_once, interval=None, jitter=None, status_file=None):
+        self.run_once = run_once
+        self.interval = interval or config.DAEMON_POLL_INTERVAL
+        self.jitter = config.DAEMON_POLL_JITTER if jitter is None else jitter
+        self.status_file = status_file or config.DAEMON_STATUS_FILE
+        self._stop = threading.Event()
+        self.status = {
+            "pid": os.getpid(), "state": "starting", "started": _utc_now(), "interval": self.interval,
+            "polls": 0, "failures": 0, "last_poll": None, "last_poll_seconds": None, "last_run": None,
+            "last_error": None, "next_poll": None
+        }
+
+    def request_stop(self, signum=None, frame=None):
+        """Signal handler: stops after the current poll (a second signal stops immediately)."""
+        if self._stop.is_set():
+            raise KeyboardInterrupt
+        logger.info(f"Received signal {signum}, stopping after the current poll...")
+        self._stop.set()
+        self._write_status(state="stopping")
+
+    def install_signal_handlers(self):
+        """Installs the SIGINT / SIGTERM handlers (must run in the main thread)."""
+        for name in ("SIGINT", "SIGTERM"):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), self.request_stop)
+
+    def next_delay(self):
+        """Seconds until the next poll: the interval spread by +/- jitter so restarts do not poll in lockstep."""
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _write_status(self, **fields):
+        self.status.update(fields, updated=_utc_now())
+        try:
+            tmp_path = f"{self.status_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.status, f, indent=2)
+            os.replace(tmp_path, self.status_file)
+        except OSError as e:
+            logger.error(f"Could not write daemon status file: {e}")
+
+    def poll(self):
+        """Runs one poll, recording its outcome in the status file."""
+        start = datetime.now(timezone.utc)
+        self._write_status(state="running", last_poll=_utc_now(), next_poll=None)
+        try:
+            result = self.run_once()
+            self._write_status(last_run=result, last_error=None)
+        except Exception as e:
+            logger.exception(f"Poll failed: {e}")
+            self._write_status(failures=self.status["failures"] + 1, last_error=f"{type(e).__name__}: {e}")
+        finally:
+            seconds = (datetime.now(timezone.utc) - start).total_seconds()
+            self._write_status(polls=self.status["polls"] + 1, last_poll_seconds=round(seconds, 2))
+
+    def run(self, max_polls=None):
+        """Polls until stopped (or max_polls polls have run)."""
+        logger.info(f"Daemon started (pid {os.getpid()}), polling every {self.interval} sec +/- {self.jitter:.0%}.")
+        try:
+            while not self._stop.is_set():
+                self.poll()
+                if self._stop.is_set() or (max_polls and self.status["polls"] >= max_polls):
+                    break
+
+                delay = self.next_delay()
+                next_poll = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                self._write_status(state="idle", next_poll=next_poll.strftime("%Y-%m-%dT%H:%M:%SZ"))
+                logger.info(f"Next poll in {delay:.0f} sec.")
+                self._stop.wait(delay)
+        finally:
+            self._write_status(state="stopped", next_poll=None)
+            logger.info(f"Daemon stopped after {self.status['polls']} polls ({self.status['failures']} failed).")
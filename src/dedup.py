@@ -0,0 +1,197 @@
+import re
+import zlib
+import sqlite3
+import threading
+import numpy as np
+import config
+from utils import job_text
+from job_store import get_job_store
+from metrics import count
+from logger import setup_logger
+
+logger = setup_logger("dedup")
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def shingles(text, size=None):
+    """Stable 32-bit hashes of the word `size`-grams of a text (one shingle for shorter texts)."""
+    size = size or config.DEDUP_SHINGLE_SIZE
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    grams = {" ".join(words[start:start + size]) for start in range(max(1, len(words) - size + 1))}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures plus an LSH band index of every job seen, persisted in SQLite.
+    - A job whose signature agrees with an indexed one on at least config.DEDUP_THRESHOLD of its
+      permutations (estimated Jaccard similarity of their shingles) is a near-duplicate.
+    - Duplicates point at the canonical job (the first copy seen), never at another duplicate.
+    - Only canonical jobs some feed still lists are matched: a repost of an expired job becomes canonical
+      itself, as does a duplicate whose canonical expired.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.DEDUP_INDEX_FILE
+        self.num_perm = config.DEDUP_NUM_PERM
+        self.bands = config.DEDUP_BANDS
+        self.rows_per_band = self.num_perm // self.bands
+
+        rng = np.random.RandomState(1)  # Fixed seed: signatures must be comparable across runs
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=self.num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=self.num_perm).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        # Signatures made with other parameters cannot be compared; start over
+        params = f"{self.num_perm}:{self.bands}:{config.DEDUP_SHINGLE_SIZE}"
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if row and row[0] != params:
+            logger.info("MinHash parameters changed, rebuilding the near-duplicate index.")
+            self._conn.execute("DROP TABLE IF EXISTS signatures")
+            self._conn.execute("DROP TABLE IF EXISTS lsh_bands")
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (params,))
+
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            "url TEXT PRIMARY KEY, signature BLOB NOT NULL, canonical_url TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS lsh_bands (bucket TEXT NOT NULL, url TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_bands_bucket ON lsh_bands (bucket)")
+        self._conn.commit()
+
+    def signature(self, text):
+        """MinHash signature (num_perm uint32 values) of a text's shingles, or None for an empty text."""
+        hashes = shingles(text)
+        if not hashes.size:
+            return None
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _buckets(self, signature):
+        """LSH bucket keys: one per band of rows_per_band signature values."""
+        return [
+            f"{band}:{zlib.crc32(signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes())}"
+            for band in range(self.bands)
+        ]
+
+    def _best_match(self, url, signature, buckets, check_listed=True):
+        """
+        Returns (canonical_url, similarity) of the most similar other indexed job sharing a bucket whose
+        canonical job is still listed (any canonical job when check_listed is off), or (None, 0).
+        """
+        placeholders = ",".join("?" * len(buckets))
+        candidates = self._conn.execute(
+            f"SELECT s.url, s.signature, s.canonical_url FROM signatures s WHERE s.url IN "
+            f"(SELECT DISTINCT url FROM lsh_bands WHERE bucket IN ({placeholders})) AND s.url != ?",
+            buckets + [url]
+        ).fetchall()
+        canonical_urls = {canonical_url for _, _, canonical_url in candidates}
+        listed = get_job_store().listed_urls(canonical_urls) if check_listed else canonical_urls
+
+        best_url, best_similarity = None, 0.0
+        for _, blob, canonical_url in candidates:
+            if canonical_url not in listed:
+                continue
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+            if similarity > best_similarity:
+                best_url, best_similarity = canonical_url, similarity
+        return best_url, best_similarity
+
+    def assign(self, jobs):
+        """
+        Indexes the jobs and returns {url: canonical_url} for those that are near-duplicates.
+        - Jobs indexed in earlier runs keep their stored canonical link while that job is listed;
+          otherwise they are matched again.
+        - Jobs in the same batch are compared with each other in order, so the first copy wins.
+        """
+        duplicates = {}
+        with self._lock:
+            urls = list(dict.fromkeys(job["url"] for job in jobs))
+            known = {}
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                known.update(self._conn.execute(
+                    f"SELECT url, canonical_url FROM signatures WHERE url IN ({placeholders})", chunk
+                ).fetchall())
+
+            # A batch no feed lists (e.g. jobs migrated from the JSON cache) proves nothing about expiry
+            check_listed = bool(get_job_store().listed_urls(urls))
+            linked = {canonical_url for url, canonical_url in known.items() if canonical_url != url}
+            listed = get_job_store().listed_urls(linked) if check_listed else linked
+            stale = {url for url, canonical_url in known.items() if canonical_url in linked and canonical_url not in listed}
+
+            for job in jobs:
+                url = job["url"]
+                if url in known and url not in stale:
+                    if known[url] != url:
+                        duplicates[url] = known[url]
+                    continue
+
+                signature = self.signature(job_text(job))
+                if signature is None:
+                    known[url] = url
+                    continue
+
+                buckets = self._buckets(signature)
+                canonical_url, similarity = self._best_match(url, signature, buckets, check_listed)
+                if canonical_url is None or similarity < config.DEDUP_THRESHOLD:
+                    canonical_url = url
+                else:
+                    duplicates[url] = canonical_url
+
+                if url in stale:
+                    # Its canonical job expired: relink it (the LSH buckets of its signature are already indexed)
+                    self._conn.execute("UPDATE signatures SET canonical_url = ? WHERE url = ?", (canonical_url, url))
+                    stale.discard(url)
+                else:
+                    self._conn.execute(
+                        "INSERT INTO signatures (url, signature, canonical_url) VALUES (?, ?, ?)",
+                        (url, signature.tobytes(), canonical_url)
+                    )
+                    self._conn.executemany("INSERT INTO lsh_bands (bucket, url) VALUES (?, ?)", [(b, url) for b in buckets])
+                known[url] = canonical_url
+
+            self._conn.commit()
+
+        count("near_duplicates", len(duplicates))
+        return duplicates
+
+
+def get_dedup_index():
+    """Returns the process-wide near-duplicate index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex()
+        return _index
+
+def collapse_near_duplicates(jobs):
+    """
+    Marks near-duplicate jobs with job["duplicate_of"] (their canonical URL) and returns the canonical ones.
+    Returns the jobs unchanged when config.DEDUP_ENABLED is off.
+    """
+    if not config.DEDUP_ENABLED or not jobs:
+        return jobs
+
+    duplicates = get_dedup_index().assign(jobs)
+    canonical_jobs = []
+    for job in jobs:
+        if job["url"] in duplicates:
+            job["duplicate_of"] = duplicates[job["url"]]
+        else:
+            canonical_jobs.append(job)
+
+    if duplicates:
+        logger.info(f"{len(duplicates)} of {len(jobs)} jobs are near-duplicates and will not be scored.")
+    return canonical_jobs
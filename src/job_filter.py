@@ -1,24 +1,35 @@
-import spacy
+import os
+import math
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import config
+from skill_matcher import get_skill_matcher
+from annotation_cache import annotation_key, get_annotation_cache
+from nlp_models import get_nlp, model_id
+from metrics import span
 
-# Load NLP Model
-print("Loading NLP Model...")
-nlp = spacy.load("en_core_web_md")  # Medium model for balanced speed & accuracy
+_worker_pool = None
+_worker_pool_key = None
+_worker_pool_lock = threading.Lock()
 
-# Convert ideal job description into vector representation
-ideal_vector = nlp(config.IDEAL_JOB_DESC).vector.reshape(1, -1)
+def _resume_skill_set(resume_skills):
+    """Converts the resume skills list into a lowercase set for token lookups."""
+    if isinstance(resume_skills, list):
+        return set(map(str.lower, resume_skills))  # Convert list of words to lowercase set
+    raise TypeError(f"Expected list for resume_skills, got {type(resume_skills)}")
 
-def extract_job_entities(text, resume_skills):
+def _annotate_doc(doc):
     """
-    Extracts key entities from a job description using Named Entity Recognition (NER).
-    - Identifies company names, job roles, and relevant skills dynamically.
-    - Uses dependency parsing to extract job titles instead of unreliable entity labels.
+    Builds the resume-independent annotation of a parsed spaCy Doc.
+    - company / job_role come from NER and dependency parsing.
+    - skills are every configured skill (single- or multi-word) found by the skill matcher.
     """
-    doc = nlp(text)
-    job_role, skills = [], []
+    job_role = []
     company_name = "Unknown"
 
     # Extract company names from the text
@@ -35,23 +46,135 @@ def extract_job_entities(text, resume_skills):
     # Construct job title from extracted words
     job_role = " ".join(job_role) if job_role else "Unknown"
 
-    # Ensure resume_skills is a list of actual words
-    if isinstance(resume_skills, list):
-        resume_skills = set(map(str.lower, resume_skills))  # Convert list of words to lowercase set
-    else:
-        raise TypeError(f"Expected list for resume_skills, got {type(resume_skills)}")
-    
-    # Extract technical terms and keywords from text
-    for token in doc:
-        if token.pos_ in ["NOUN", "PROPN"] and token.text.lower() in resume_skills:
-            skills.append(token.text)
-
     return {
         "company": company_name,
         "job_role": job_role,
+        "skills": get_skill_matcher().find(doc.text)
+    }
+
+def _entities_from_annotation(annotation, resume_skill_set):
+    """Builds the company / job role / skills dict from an annotation and the resume skills."""
+    skills = [skill for skill in annotation["skills"] if skill.lower() in resume_skill_set]
+    return {
+        "company": annotation["company"],
+        "job_role": annotation["job_role"],
         "skills": list(set(skills))
     }
 
+def _model_id():
+    """Identifies the pipeline (name and version) and skill taxonomy for the annotation cache."""
+    return f"{model_id()}+skills-{get_skill_matcher().version}"
+
+def extract_job_entities(text, resume_skills):
+    """
+    Extracts key entities from a job description using Named Entity Recognition (NER).
+    - Identifies company names, job roles, and relevant skills dynamically.
+    - Uses dependency parsing to extract job titles instead of unreliable entity labels.
+    """
+    resume_skill_set = _resume_skill_set(resume_skills)
+    return _entities_from_annotation(_annotate_doc(get_nlp()(text)), resume_skill_set)
+
+def resolve_workers(workers=None):
+    """Worker processes to annotate with: config.SCORING_WORKERS by default, 0 meaning one per CPU."""
+    workers = config.SCORING_WORKERS if workers is None else workers
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def _init_annotation_worker(model_name, excluded_pipes, skills):
+    """
+    Pool initializer: mirrors the parent's NLP settings and loads the model once per worker.
+    (Workers are spawned, so runtime config changes would otherwise be lost.)
+    """
+    config.NLP_MODEL = model_name
+    config.NLP_EXCLUDED_PIPES = list(excluded_pipes)
+    config.TECHNICAL_SKILLS = list(skills)
+    get_nlp()
+
+def _annotate_shard(texts, batch_size):
+    """Annotates one shard of descriptions inside a worker process."""
+    return [_annotate_doc(doc) for doc in get_nlp().pipe(texts, batch_size=batch_size)]
+
+def _get_worker_pool(workers):
+    """Returns the shared annotation pool, (re)starting it when the worker count or NLP settings change."""
+    global _worker_pool, _worker_pool_key
+    key = (workers, config.NLP_MODEL, tuple(config.NLP_EXCLUDED_PIPES), tuple(config.TECHNICAL_SKILLS))
+    with _worker_pool_lock:
+        if _worker_pool_key != key:
+            if _worker_pool is not None:
+                _worker_pool.shutdown()
+            # Spawned rather than forked: the parent holds threads (prewarm, fetch pool) and SQLite handles
+            _worker_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_annotation_worker,
+                initargs=key[1:]
+            )
+            _worker_pool_key = key
+        return _worker_pool
+
+def shutdown_worker_pool():
+    """Stops the annotation worker processes (they are otherwise kept warm between runs)."""
+    global _worker_pool, _worker_pool_key
+    with _worker_pool_lock:
+        if _worker_pool is not None:
+            _worker_pool.shutdown()
+        _worker_pool, _worker_pool_key = None, None
+
+def _annotate_parallel(texts, batch_size, workers):
+    """
+    Shards texts across the worker pool and returns their annotations in input order.
+    - A few shards per worker keep the load balanced; map() returns shards in submission
+      order, so the merge is deterministic and matches the serial path.
+    """
+    shard_size = max(batch_size, math.ceil(len(texts) / (workers * 4)))
+    shards = [texts[start:start + shard_size] for start in range(0, len(texts), shard_size)]
+    pool = _get_worker_pool(workers)
+    results = pool.map(_annotate_shard, shards, [batch_size] * len(shards))
+    return [annotation for shard in results for annotation in shard]
+
+def extract_job_entities_batch(texts, resume_skills, batch_size=None, n_process=None, cache=None, workers=None):
+    """
+    Batched version of extract_job_entities for a whole job pool.
+    - Returns one entity dict per text, in input order, identical to the per-job results.
+    """
+    resume_skill_set = _resume_skill_set(resume_skills)
+    annotations = annotate_jobs_batch(texts, batch_size=batch_size, n_process=n_process, cache=cache, workers=workers)
+    return [_entities_from_annotation(annotation, resume_skill_set) for annotation in annotations]
+
+def annotate_jobs_batch(texts, batch_size=None, n_process=None, cache=None, workers=None):
+    """
+    Resume-independent annotations (company, job role, all skills) of many descriptions, in input order.
+    - Descriptions already annotated (same text, same model) are read from the annotation cache.
+    - The rest stream through nlp.pipe instead of one nlp() call per job.
+    - workers > 1 shards the uncached descriptions across a process pool whose workers load the model once.
+    """
+    batch_size = batch_size or config.NLP_BATCH_SIZE
+    n_process = n_process or config.NLP_N_PROCESS
+    workers = resolve_workers(workers)
+    cache = cache or get_annotation_cache()
+
+    with span("annotate", items=len(texts)) as stage:
+        model_id = _model_id()
+        keys = [annotation_key(text, model_id) for text in texts]
+        annotations = cache.get_many(keys)
+        stage.count("annotation_cache_hits", len(annotations))
+
+        # Parse each distinct uncached description once
+        missing = {key: text for key, text in zip(keys, texts) if key not in annotations}
+        if missing:
+            stage.count("nlp_docs", len(missing))
+            # Small batches are not worth shipping to other processes
+            if workers > 1 and len(missing) > batch_size:
+                annotated = _annotate_parallel(list(missing.values()), batch_size, workers)
+                parsed = dict(zip(missing.keys(), annotated))
+            else:
+                # The model is only loaded (or taken from the registry) when something is not cached
+                docs = get_nlp().pipe(missing.values(), batch_size=batch_size, n_process=n_process)
+                parsed = {key: _annotate_doc(doc) for key, doc in zip(missing.keys(), docs)}
+            cache.put_many(parsed)
+            annotations.update(parsed)
+
+        return [annotations[key] for key in keys]
+
 def compute_tfidf_weights(jobs):
     """
     Computes TF-IDF scores for all job descriptions to weigh skill importance.
@@ -67,8 +190,16 @@ def compute_tfidf_weights(jobs):
 
     return vectorizer, tfidf_matrix, feature_names
 
-def score_job_relevance(job_title, job_description, job_vector, vectorizer, feature_names, resume_skills, ideal_job_vector):
-    """Calculates job relevance using TF-IDF cosine similarity, skill matching, and title weighting."""
+def _title_match_weight(job_title):
+    """Returns the bonus for titles containing one of config.TARGET_TITLES."""
+    job_title_lower = job_title.lower()
+    return 5 if any(title in job_title_lower for title in config.TARGET_TITLES) else 0
+
+def score_job_relevance(job_title, job_description, job_vector, vectorizer, feature_names, resume_skills, ideal_job_vector, job_info=None):
+    """
+    Calculates job relevance using TF-IDF cosine similarity, skill matching, and title weighting.
+    - Pass job_info from extract_job_entities_batch to skip the per-job NLP call.
+    """
 
     # Convert sparse vector to array
     job_tfidf_vector = job_vector.toarray()
@@ -76,17 +207,126 @@ def score_job_relevance(job_title, job_description, job_vector, vectorizer, feat
     # Compute similarity with ideal job profile
     similarity_score = cosine_similarity(job_tfidf_vector, ideal_job_vector.toarray())[0][0]
 
-    # Extract job details
-    job_info = extract_job_entities(job_description, resume_skills)
+    # Extract job details (unless already extracted in batch)
+    if job_info is None:
+        job_info = extract_job_entities(job_description, resume_skills)
 
     # Skill match count
-    skill_match_count = sum(1 for skill in job_info["skills"] if skill.lower() in resume_skills)
+    resume_skill_set = _resume_skill_set(resume_skills)
+    skill_match_count = sum(1 for skill in job_info["skills"] if skill.lower() in resume_skill_set)
 
     # Title match weight
-    job_title_lower = job_title.lower()
-    title_match_weight = 5 if any(title in job_title_lower for title in config.TARGET_TITLES) else 0
+    title_match_weight = _title_match_weight(job_title)
 
     # Compute final score with scaling
     final_score = (similarity_score * 100) + (skill_match_count * 5) + title_match_weight
 
-    return float(final_score)  # Convert to standard float
\ No newline at end of file
+    return float(final_score)  # Convert to standard float
+
+def _cosine_similarities(job_tfidf_vectors, ideal_vectors):
+    """
+    Jobs x ideal-descriptions cosine similarity as one sparse matrix product in float32
+    (no per-row densification). Returns a dense (jobs, ideals) array.
+    """
+    job_matrix = sparse.csr_matrix(job_tfidf_vectors, dtype=np.float32)
+    ideal_matrix = sparse.csr_matrix(ideal_vectors, dtype=np.float32)
+
+    dot_products = (job_matrix @ ideal_matrix.T).toarray()
+    job_norms = np.sqrt(np.asarray(job_matrix.multiply(job_matrix).sum(axis=1), dtype=np.float32).ravel())
+    ideal_norms = np.sqrt(np.asarray(ideal_matrix.multiply(ideal_matrix).sum(axis=1), dtype=np.float32).ravel())
+    norm_products = np.outer(job_norms, ideal_norms)
+    return np.divide(
+        dot_products, norm_products,
+        out=np.zeros(dot_products.shape, dtype=np.float32), where=norm_products > 0
+    )
+
+def _blend_semantic(similarity_scores, semantic_similarities, weight=None):
+    """Mixes the word-vector cosine into the TF-IDF cosine by config.SEMANTIC_BLEND_WEIGHT (negative cosines count as 0)."""
+    weight = config.SEMANTIC_BLEND_WEIGHT if weight is None else weight
+    semantic_scores = np.clip(np.asarray(semantic_similarities, dtype=np.float32), 0, 1)
+    return ((1 - weight) * similarity_scores + weight * semantic_scores).astype(np.float32)
+
+def score_jobs_matrix(jobs, job_tfidf_vectors, ideal_job_vector, resume_skills, job_infos, threshold=None,
+                      similarities=None, semantic_similarities=None):
+    """
+    Scores every job in one pass over the whole TF-IDF matrix (same formula as score_job_relevance).
+    - Cosine similarity is a single sparse matrix-vector product in float32, no per-row densification.
+    - similarities (one value in [0, 1] per job, e.g. from the BM25 engine) replaces the TF-IDF cosine.
+    - semantic_similarities (word-vector cosines from the semantic engine) are blended into the TF-IDF cosine.
+    - job_infos may also be annotations (see annotate_jobs_batch): only the resume's skills are counted.
+    - Returns (scores, mask) where mask marks the jobs above the relevance threshold.
+    """
+    with span("score", items=len(jobs)):
+        threshold = config.RELEVANCE_SCORE_THRESHOLD if threshold is None else threshold
+        total_jobs = len(jobs)
+        resume_skill_set = _resume_skill_set(resume_skills)
+
+        # Cosine similarity of every job row against the ideal job vector
+        if similarities is None:
+            similarity_scores = _cosine_similarities(job_tfidf_vectors, ideal_job_vector)[:, 0]
+            if semantic_similarities is not None:
+                similarity_scores = _blend_semantic(similarity_scores, semantic_similarities)
+        else:
+            similarity_scores = np.asarray(similarities, dtype=np.float32)
+
+        # Skill match counts and title weights, one entry per job
+        skill_match_counts = np.fromiter(
+            (sum(1 for skill in job_info["skills"] if skill.lower() in resume_skill_set) for job_info in job_infos),
+            dtype=np.float32, count=total_jobs
+        )
+        title_match_weights = np.fromiter(
+            (_title_match_weight(job["title"]) for job in jobs), dtype=np.float32, count=total_jobs
+        )
+
+        scores = (similarity_scores * 100) + (skill_match_counts * 5) + title_match_weights
+        return scores, scores > threshold
+
+def score_jobs_profiles(jobs, job_tfidf_vectors, ideal_vectors, resume_skill_lists, annotations, threshold=None,
+                        similarities=None, semantic_similarities=None):
+    """
+    Scores every job against several profiles at once (same formula as score_jobs_matrix).
+    - ideal_vectors has one TF-IDF row per profile; similarities are a single jobs x profiles product.
+    - similarities (jobs x profiles, e.g. from the BM25 engine) replaces the TF-IDF cosine.
+    - semantic_similarities (jobs x profiles, from the semantic engine) are blended into the TF-IDF cosine.
+    - Skill matches are a jobs x skills indicator matrix times a profiles x skills indicator matrix.
+    - Returns (scores, mask) of shape (jobs, profiles).
+    """
+    with span("score", items=len(jobs)):
+        threshold = config.RELEVANCE_SCORE_THRESHOLD if threshold is None else threshold
+        total_jobs = len(jobs)
+        if similarities is None:
+            similarity_scores = _cosine_similarities(job_tfidf_vectors, ideal_vectors)
+            if semantic_similarities is not None:
+                similarity_scores = _blend_semantic(similarity_scores, semantic_similarities)
+        else:
+            similarity_scores = np.asarray(similarities, dtype=np.float32)
+
+        # Skills are matched case-insensitively, so index them by their lowercase form
+        skill_columns = {}
+        rows, cols = [], []
+        for row, annotation in enumerate(annotations):
+            for skill in {skill.lower() for skill in annotation["skills"]}:
+                rows.append(row)
+                cols.append(skill_columns.setdefault(skill, len(skill_columns)))
+        job_skills = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(total_jobs, len(skill_columns))
+        )
+
+        profile_rows, profile_cols = [], []
+        for row, resume_skills in enumerate(resume_skill_lists):
+            for skill in _resume_skill_set(resume_skills):
+                if skill in skill_columns:
+                    profile_rows.append(row)
+                    profile_cols.append(skill_columns[skill])
+        profile_skills = sparse.csr_matrix(
+            (np.ones(len(profile_rows), dtype=np.float32), (profile_rows, profile_cols)),
+            shape=(len(resume_skill_lists), len(skill_columns))
+        )
+        skill_match_counts = (job_skills @ profile_skills.T).toarray()
+
+        title_match_weights = np.fromiter(
+            (_title_match_weight(job["title"]) for job in jobs), dtype=np.float32, count=total_jobs
+        )
+
+        scores = (similarity_scores * 100) + (skill_match_counts * 5) + title_match_weights[:, None]
+        return scores, scores > threshold
@@ -1,107 +1,417 @@
-import time
+import heapq
+import argparse
 import logging
 import os
 from datetime import datetime
 import config
-from job_scraper import get_new_jobs, load_cached_jobs
-from job_filter import score_job_relevance
-from job_writer import add_filtered_jobs_to_sheets
+from job_scraper import get_new_jobs, load_cached_jobs, iter_cached_jobs
+from job_filter import (
+    annotate_jobs_batch, score_jobs_matrix, score_jobs_profiles,
+    resolve_workers, shutdown_worker_pool
+)
+from job_writer import add_filtered_jobs_to_sheets, add_jobs_to_pool
 from skill_extractor import get_resume_skills
-from sklearn.feature_extraction.text import TfidfVectorizer
+from tfidf_ranker import vectorize_jobs, prepare_tfidf_model
+from bm25_ranker import bm25_similarities, update_bm25_index
+from semantic_ranker import semantic_similarities
+from annotation_cache import get_annotation_cache
+from api_scheduler import all_scheduler_stats, reset_scheduler_stats
+from nlp_models import prewarm
+from profiles import load_profiles, DEFAULT_PROFILE
+from job_store import get_job_store
+from dedup import collapse_near_duplicates
+from metrics import span, start_run, finish_run
+from daemon import Daemon
 import numpy as np
+from utils import job_text
 from logger import setup_logger
 
 logger = setup_logger("job_processor")
 
 logger.info("Starting job processing...")
 
+# Ranking engines: {config / --engine name: "Model Used" column value}
+ENGINE_NAMES = {"tfidf": "TF-IDF", "bm25": "BM25", "semantic": "TF-IDF + Word Vectors"}
 
-def process_jobs():
-    """Fetches, processes, and filters jobs using NLP-based relevance scoring with TF-IDF."""
+
+def process_jobs(refit_tfidf=False, profile_stage=None, stream=None, chunk_size=None, workers=None, profiles=None,
+                 rescore_cached=True, engine=None):
+    """
+    Fetches, processes, and filters jobs using NLP-based relevance scoring with TF-IDF.
+    - refit_tfidf forces a full refit of the persisted TF-IDF model.
+    - stream (default config.STREAMING_PIPELINE) processes the jobs in chunks of chunk_size.
+    - workers (default config.SCORING_WORKERS) annotates descriptions in that many processes.
+    - profiles (names from config.PROFILES, default all of them when configured) scores every profile in one pass.
+    - engine (default config.RANKING_ENGINE) ranks by TF-IDF cosine ("tfidf"), by BM25 over the inverted index ("bm25"),
+      or by the TF-IDF cosine blended with the stored word-vector similarity ("semantic").
+    - rescore_cached=False skips scoring and the Recommended Jobs sync when no new jobs came in (daemon polls only do incremental work).
+    - Per-stage metrics are appended to config.METRICS_FILE; profile_stage runs one stage under cProfile.
+    Returns the run's metrics record (None when metrics are disabled).
+    """
+    stream = config.STREAMING_PIPELINE if stream is None else stream
+    engine = engine or config.RANKING_ENGINE
+    if engine not in ENGINE_NAMES:
+        raise ValueError(f"Unknown ranking engine '{engine}'. Available: {', '.join(ENGINE_NAMES)}")
+    workers = resolve_workers(workers)
+    multi_profile = profiles is not None or bool(config.PROFILES)
+    if multi_profile and stream:
+        logger.warning("Streaming mode scores a single profile; running the multi-profile batch pipeline instead.")
+
+    # Daemon polls reuse the schedulers, whose stats would otherwise add up across runs
+    reset_scheduler_stats()
+    if config.METRICS_ENABLED:
+        start_run(profile_stage)
+    try:
+        if multi_profile:
+            _run_profiles_pipeline(refit_tfidf, workers, load_profiles(profiles), rescore_cached, engine)
+        elif stream:
+            _run_streaming_pipeline(refit_tfidf, chunk_size or config.PIPELINE_CHUNK_SIZE, workers, rescore_cached, engine)
+        else:
+            _run_pipeline(refit_tfidf, workers, rescore_cached, engine)
+    finally:
+        record = finish_run()
+        if record:
+            stage_times = ", ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in record["stages"].items())
+            logger.info(f"Run metrics: {record['seconds']:.2f} sec total ({stage_times}), peak RSS {record['peak_rss_mb']} MB")
+    return record
+
+def _run_pipeline(refit_tfidf, workers, rescore_cached=True, engine="tfidf"):
     logger.info("Starting job processing...")
 
+    # Load the spaCy model in the background while the fetch is in flight
+    if config.NLP_PREWARM:
+        prewarm()
+
+    print("Fetching new jobs from Remotive.io...")
+    new_jobs = get_new_jobs()
+
+    # Remotive answered 304 Not Modified: nothing changed since the last run
+    if new_jobs is None:
+        logger.info("No feed changed since the last fetch (or none could be read). Skipping processing.\n")
+        return
+
     # Step 1: Extract skills from resume
     print("Extracting skills from resume...")
     resume_skills = get_resume_skills()
     print(f"Extracted Skills: {', '.join(resume_skills)}")
     logger.info(f"Extracted Skills: {resume_skills}")
 
-    print("Fetching new jobs from Remotive.io...")
-    new_jobs = get_new_jobs()
-
     # Step 2: Check if new jobs exist
     if new_jobs:
         print(f"{len(new_jobs)} new jobs found. Adding to Job Pool...")
         logger.info(f"{len(new_jobs)} new jobs found. Adding to Job Pool...")
-        add_filtered_jobs_to_sheets(new_jobs, update_pool=True)
+        # Near-duplicates are marked before the Job Pool write so the pool records their canonical job;
+        # the pool is written in step 5, alongside the single Recommended Jobs sync of the run
+        canonical_jobs = collapse_near_duplicates(new_jobs)
+        pool_jobs, new_jobs = new_jobs, canonical_jobs
+
+    elif not rescore_cached:
+        _skip_scoring()
+        return
 
     else:
         print("No new jobs found. Using cached jobs...")
         logger.warning("No new jobs fetched. Using cached jobs.")
-        new_jobs = load_cached_jobs()
+        pool_jobs = None
+        new_jobs = collapse_near_duplicates(load_cached_jobs())
 
     print(f"{len(new_jobs)} jobs fetched. Computing TF-IDF and filtering relevant ones...")
     logger.info(f"Fetched {len(new_jobs)} jobs. Computing TF-IDF...")
 
-    # **Step 3: Compute TF-IDF for all job descriptions**
-    job_texts = [job["description"] for job in new_jobs] + [config.IDEAL_JOB_DESC]  # Add ideal job description
-    vectorizer = TfidfVectorizer(stop_words="english", max_features=5000)
-    tfidf_matrix = vectorizer.fit_transform(job_texts)  # Compute TF-IDF matrix
-    feature_names = vectorizer.get_feature_names_out()
+    # **Step 3: Compute TF-IDF for all job descriptions (persisted model, refit only on demand or drift)**
+    # **or, with the BM25 engine, update the inverted index and rank against it**
+    # **(the semantic engine also reads the jobs' word vectors, computing only those it has not stored yet)**
+    with span("vectorize", items=len(new_jobs)):
+        if engine == "bm25":
+            job_tfidf_vectors = ideal_job_vector = None
+            similarities = bm25_similarities(new_jobs, [config.IDEAL_JOB_DESC], [resume_skills])[:, 0]
+        else:
+            job_tfidf_vectors, ideal_job_vector = vectorize_jobs(new_jobs, refit=refit_tfidf)
+            similarities = None
+        semantic = semantic_similarities(new_jobs, [config.IDEAL_JOB_DESC])[:, 0] if engine == "semantic" else None
 
-    # **Extract Ideal Job Vector**
-    ideal_job_vector = tfidf_matrix[-1]  # Last entry is the ideal job description
-    job_tfidf_vectors = tfidf_matrix[:-1]  # Exclude ideal job vector from job postings
+    logger.info("TF-IDF computation complete. Extracting job entities in batch...")
 
-    logger.info("TF-IDF computation complete. Starting job relevance scoring.")
+    # **Run NLP over all descriptions at once (nlp.pipe) instead of one job at a time**
+    annotations = annotate_jobs_batch([job_text(job) for job in new_jobs], workers=workers)
+    _log_annotation_cache_stats()
 
-    # **Step 4: Process and score Jobs in Batches**
-    filtered_jobs = []
-    batch_size = 100
-    total_jobs = len(new_jobs)
-    start_time = time.time()
+    logger.info("Starting job relevance scoring.")
 
-    for idx, (job, job_vector) in enumerate(zip(new_jobs, job_tfidf_vectors)):
-        score = score_job_relevance(job["title"], job["description"], job_vector, vectorizer, feature_names, resume_skills, ideal_job_vector)
+    # **Step 4: Score all jobs at once over the whole TF-IDF matrix**
+    total_jobs = len(new_jobs)
 
-        logger.debug(f"Job {idx+1}/{total_jobs}: {job['title']} | Score: {score}")
+    with span("filter", items=total_jobs) as filter_stage:
+        scores, relevant_mask = score_jobs_matrix(
+            new_jobs, job_tfidf_vectors, ideal_job_vector, resume_skills, annotations, similarities=similarities,
+            semantic_similarities=semantic
+        )
+        _save_scores(DEFAULT_PROFILE, new_jobs, scores, relevant_mask, annotations, resume_skills)
 
-        if score > 3.5:
-            filtered_jobs.append({
-                "title": job["title"],
-                "company": job["company_name"],
-                "location": job["candidate_required_location"],
-                "url": job["url"],
-                "score": float(score)
-            })
+        if logger.isEnabledFor(logging.DEBUG):
+            for idx, (job, score) in enumerate(zip(new_jobs, scores)):
+                logger.debug(f"Job {idx+1}/{total_jobs}: {job['title']} | Score: {score}")
 
-        # **Log progress every batch_size jobs**
-        if (idx + 1) % batch_size == 0:
-            elapsed_time = time.time() - start_time
-            print(f"Processed {idx+1}/{total_jobs} jobs... Time elapsed: {elapsed_time:.2f} sec")
-            logger.info(f"Processed {idx+1}/{total_jobs} jobs... Time elapsed: {elapsed_time:.2f} sec")
+        filtered_jobs = [_filtered_job(new_jobs[idx], scores[idx]) for idx in np.flatnonzero(relevant_mask)]
 
-    total_time = time.time() - start_time
-    print(f"Job filtering completed in {total_time:.2f} sec")
-    logger.info(f"Job filtering completed in {total_time:.2f} sec")
+    print(f"Job filtering completed in {filter_stage.seconds:.2f} sec")
+    logger.info(f"Job filtering completed in {filter_stage.seconds:.2f} sec")
 
-    # **Step 5: Save to Recommended Jobs if any filtered jobs exist**
+    # **Step 5: Save to Recommended Jobs if any filtered jobs exist (and the new jobs to the Job Pool)**
     if filtered_jobs:
         print(f"{len(filtered_jobs)} relevant jobs found. Saving to Recommended Jobs sheet...")
         logger.info(f"{len(filtered_jobs)} relevant jobs found. Saving to Recommended Jobs sheet...")
-        add_filtered_jobs_to_sheets(filtered_jobs)
+        add_filtered_jobs_to_sheets(filtered_jobs, model_used=ENGINE_NAMES[engine], pool_jobs=pool_jobs)
     else:
         print("No relevant jobs found.")
         logger.warning("No jobs passed the filtering criteria.")
+        if pool_jobs:
+            add_jobs_to_pool(pool_jobs, model_used=ENGINE_NAMES[engine])
 
     # **Sort jobs by score**
     sorted_jobs = sorted(filtered_jobs, key=lambda x: x["score"], reverse=True)
+    _log_results(sorted_jobs)
+
+def _run_streaming_pipeline(refit_tfidf, chunk_size, workers, rescore_cached=True, engine="tfidf"):
+    """
+    Chunked variant of _run_pipeline: jobs are read back from the job store chunk_size at a time,
+    so peak memory follows the chunk size, not the pool size.
+    - The TF-IDF model is updated over all chunks first, so every chunk is scored with the final IDF;
+      its term counts are read back per chunk too.
+    - Only a bounded heap of the best jobs survives a chunk; Recommended Jobs gets the global top-N.
+    - What still grows with the pool: the BM25 and embedding stores' per-job index entries (URL, doc id
+      or row, text hash) and, in a run that expires jobs, the list of expired URLs.
+    """
+    logger.info(f"Starting streaming job processing (chunks of {chunk_size})...")
+
+    if config.NLP_PREWARM:
+        prewarm()
+
+    print("Fetching new jobs from Remotive.io...")
+    new_jobs = get_new_jobs(collect=False)
+
+    if new_jobs is None:
+        logger.info("No feed changed since the last fetch (or none could be read). Skipping processing.\n")
+        return
+
+    # Step 1: Extract skills from resume
+    print("Extracting skills from resume...")
+    resume_skills = get_resume_skills()
+    print(f"Extracted Skills: {', '.join(resume_skills)}")
+    logger.info(f"Extracted Skills: {resume_skills}")
+
+    # Step 2: New jobs go to the Job Pool one chunk at a time, as each chunk is scored (step 4)
+    update_pool = bool(new_jobs)
+    if new_jobs:
+        print(f"{len(new_jobs)} new jobs found. Adding to Job Pool...")
+        logger.info(f"{len(new_jobs)} new jobs found. Adding to Job Pool...")
+
+        def job_chunks():
+            return new_jobs.chunks(chunk_size)
+    elif not rescore_cached:
+        _skip_scoring()
+        return
+    else:
+        print("No new jobs found. Using cached jobs...")
+        logger.warning("No new jobs fetched. Using cached jobs.")
+
+        def job_chunks():
+            return iter_cached_jobs(chunk_size)
+
+    # **Step 3: Fold every chunk into the persisted TF-IDF model before scoring any of them**
+    with span("vectorize"):
+        if engine == "bm25":
+            bm25_index = update_bm25_index(job_chunks())
+        else:
+            model = prepare_tfidf_model(job_chunks, refit=refit_tfidf)
+            ideal_job_vector = model.transform_text(config.IDEAL_JOB_DESC)
+
+    # **Step 4: Annotate and score chunk by chunk, keeping a bounded min-heap of the best jobs**
+    top_n = max(config.TOP_N_JOBS, 10)
+    leaders = []  # (score, -position, job): ties keep the earlier job, as the stable sort does
+    total_jobs = relevant_jobs = 0
+
+    with span("filter") as filter_stage:
+        for chunk in job_chunks():
+            # Near-duplicates are marked once: the Job Pool records their canonical job, and they are not scored
+            canonical_chunk = collapse_near_duplicates(chunk)
+            if update_pool:
+                add_jobs_to_pool(chunk, model_used=ENGINE_NAMES[engine])
+            chunk = canonical_chunk
+            if not chunk:
+                continue
+            annotations = annotate_jobs_batch([job_text(job) for job in chunk], workers=workers)
+            if engine == "bm25":
+                similarities = bm25_index.similarities(chunk, config.IDEAL_JOB_DESC, resume_skills)
+                scores, relevant_mask = score_jobs_matrix(chunk, None, None, resume_skills, annotations, similarities=similarities)
+            else:
+                semantic = semantic_similarities(chunk, [config.IDEAL_JOB_DESC])[:, 0] if engine == "semantic" else None
+                scores, relevant_mask = score_jobs_matrix(
+                    chunk, model.transform(chunk), ideal_job_vector, resume_skills, annotations, semantic_similarities=semantic
+                )
+            _save_scores(DEFAULT_PROFILE, chunk, scores, relevant_mask, annotations, resume_skills)
+
+            for idx in np.flatnonzero(relevant_mask):
+                entry = (float(scores[idx]), -(total_jobs + idx), _filtered_job(chunk[idx], scores[idx]))
+                if len(leaders) < top_n:
+                    heapq.heappush(leaders, entry)
+                else:
+                    heapq.heappushpop(leaders, entry)
 
+            relevant_jobs += int(relevant_mask.sum())
+            total_jobs += len(chunk)
+            logger.info(f"Scored {total_jobs} jobs, {relevant_jobs} relevant so far.")
+        filter_stage.items = total_jobs
+
+    _log_annotation_cache_stats()
+    print(f"{total_jobs} jobs scored. Job filtering completed in {filter_stage.seconds:.2f} sec")
+    logger.info(f"{total_jobs} jobs scored. Job filtering completed in {filter_stage.seconds:.2f} sec")
+
+    sorted_jobs = [job for _, _, job in sorted(leaders, reverse=True)]
+
+    # **Step 5: Save the global top-N to Recommended Jobs**
+    if sorted_jobs:
+        print(f"{relevant_jobs} relevant jobs found. Saving the top {len(sorted_jobs)} to Recommended Jobs sheet...")
+        logger.info(f"{relevant_jobs} relevant jobs found. Saving the top {len(sorted_jobs)} to Recommended Jobs sheet...")
+        add_filtered_jobs_to_sheets(sorted_jobs, model_used=ENGINE_NAMES[engine])
+    else:
+        print("No relevant jobs found.")
+        logger.warning("No jobs passed the filtering criteria.")
+
+    _log_results(sorted_jobs)
+
+def _run_profiles_pipeline(refit_tfidf, workers, profiles, rescore_cached=True, engine="tfidf"):
+    """
+    Scores the jobs against several candidate profiles in one pass.
+    - Fetch, HTML cleaning, TF-IDF vectorization and NLP annotation are shared by all profiles.
+    - Similarities are one jobs x profiles sparse product; each profile gets its own Recommended tab.
+    """
+    logger.info(f"Starting job processing for {len(profiles)} profiles: {', '.join(p['name'] for p in profiles)}")
+
+    if config.NLP_PREWARM:
+        prewarm()
+
+    print("Fetching new jobs from Remotive.io...")
+    new_jobs = get_new_jobs()
+
+    if new_jobs is None:
+        logger.info("No feed changed since the last fetch (or none could be read). Skipping processing.\n")
+        return
+
+    # Step 1: Extract skills from every profile's resume (cached per resume file)
+    resume_skill_lists = []
+    for profile in profiles:
+        resume_skills = get_resume_skills(profile["resume_file"])
+        resume_skill_lists.append(resume_skills)
+        logger.info(f"[{profile['name']}] Extracted Skills: {resume_skills}")
+
+    # Step 2: New jobs go to the (shared) Job Pool
+    if new_jobs:
+        print(f"{len(new_jobs)} new jobs found. Adding to Job Pool...")
+        logger.info(f"{len(new_jobs)} new jobs found. Adding to Job Pool...")
+        canonical_jobs = collapse_near_duplicates(new_jobs)
+        add_jobs_to_pool(new_jobs, model_used=ENGINE_NAMES[engine])
+        new_jobs = canonical_jobs
+    elif not rescore_cached:
+        _skip_scoring()
+        return
+    else:
+        print("No new jobs found. Using cached jobs...")
+        logger.warning("No new jobs fetched. Using cached jobs.")
+        new_jobs = collapse_near_duplicates(load_cached_jobs())
+
+    # **Step 3: One TF-IDF pass for the jobs, one row per profile's ideal description**
+    with span("vectorize", items=len(new_jobs)):
+        ideal_texts = [profile["ideal_job_desc"] for profile in profiles]
+        if engine == "bm25":
+            job_tfidf_vectors = ideal_vectors = None
+            similarities = bm25_similarities(new_jobs, ideal_texts, resume_skill_lists)
+        else:
+            job_tfidf_vectors, ideal_vectors = vectorize_jobs(new_jobs, refit=refit_tfidf, ideal_texts=ideal_texts)
+            similarities = None
+        semantic = semantic_similarities(new_jobs, ideal_texts) if engine == "semantic" else None
+
+    # **Annotate once; the annotations do not depend on the resume**
+    annotations = annotate_jobs_batch([job_text(job) for job in new_jobs], workers=workers)
+    _log_annotation_cache_stats()
+
+    # **Step 4: Score all jobs against all profiles at once**
+    with span("filter", items=len(new_jobs)) as filter_stage:
+        scores, relevant_mask = score_jobs_profiles(
+            new_jobs, job_tfidf_vectors, ideal_vectors, resume_skill_lists, annotations, similarities=similarities,
+            semantic_similarities=semantic
+        )
+        for col, (profile, resume_skills) in enumerate(zip(profiles, resume_skill_lists)):
+            _save_scores(profile["name"], new_jobs, scores[:, col], relevant_mask[:, col], annotations, resume_skills)
+
+    print(f"Job filtering completed in {filter_stage.seconds:.2f} sec")
+    logger.info(f"Job filtering completed in {filter_stage.seconds:.2f} sec")
+
+    # **Step 5: Fan the results out to each profile's Recommended tab**
+    for col, profile in enumerate(profiles):
+        filtered_jobs = [_filtered_job(new_jobs[idx], scores[idx, col]) for idx in np.flatnonzero(relevant_mask[:, col])]
+        if filtered_jobs:
+            print(f"[{profile['name']}] {len(filtered_jobs)} relevant jobs found. Saving to '{profile['sheet_name']}'...")
+            logger.info(f"[{profile['name']}] {len(filtered_jobs)} relevant jobs found. Saving to '{profile['sheet_name']}'...")
+            add_filtered_jobs_to_sheets(filtered_jobs, model_used=ENGINE_NAMES[engine], sheet_name=profile["sheet_name"])
+        else:
+            print(f"[{profile['name']}] No relevant jobs found.")
+            logger.warning(f"[{profile['name']}] No jobs passed the filtering criteria.")
+
+        sorted_jobs = sorted(filtered_jobs, key=lambda x: x["score"], reverse=True)
+        logger.info(f"[{profile['name']}] Top 10 highest-scoring jobs:")
+        for job in sorted_jobs[:10]:
+            logger.info(f"{job['title']} | {job['company']} | Score: {job['score']}")
+
+    for quota, stats in all_scheduler_stats().items():
+        logger.info(f"Google API '{quota}': {stats}")
+
+    logger.info("Job processing completed.\n")
+
+def _save_scores(profile_name, jobs, scores, relevant_mask, annotations, resume_skills):
+    """
+    Records every job's score in the job store, where the query API reads them.
+    - Both the skills matched against the resume and all the skills of the job are stored.
+    """
+    resume_skill_set = {skill.lower() for skill in resume_skills}
+    get_job_store().save_scores(profile_name, [
+        (job["url"], score, relevant, [skill for skill in annotation["skills"] if skill.lower() in resume_skill_set],
+         annotation["skills"])
+        for job, score, relevant, annotation in zip(jobs, scores, relevant_mask, annotations)
+    ])
+
+def _skip_scoring():
+    """
+    No new jobs and no full rescore: nothing is scored and Recommended Jobs is not synced
+    (postings the feeds dropped leave it at the next run that scores new jobs).
+    """
+    print("No new jobs found. Nothing to score.")
+    logger.info("No new jobs fetched. Skipping scoring and the Recommended Jobs sync.")
+
+def _filtered_job(job, score):
+    """Row handed to the Recommended Jobs writer for a job that passed the filter."""
+    return {
+        "title": job["title"],
+        "company": job["company_name"],
+        "location": job["candidate_required_location"],
+        "url": job["url"],
+        "score": float(score)
+    }
+
+def _log_annotation_cache_stats():
+    cache_stats = get_annotation_cache().stats()
+    logger.info(f"Annotation cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.1%} hit rate)")
+    get_annotation_cache().reset_stats()
+
+def _log_results(sorted_jobs):
     # **Log top 10 jobs**
     logger.info("Top 10 highest-scoring jobs:")
     for job in sorted_jobs[:10]:
         logger.info(f"{job['title']} | {job['company']} | Score: {job['score']}")
 
+    for quota, stats in all_scheduler_stats().items():
+        logger.info(f"Google API '{quota}': {stats}")
+
     logger.info("Job processing completed.\n")
 
 
@@ -111,8 +421,47 @@ def close_logger():
         handler.close()
         logger.removeHandler(handler)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch, score and track remote jobs.")
+    parser.add_argument("--refit-tfidf", action="store_true", help="Refit the persisted TF-IDF model from scratch")
+    parser.add_argument("--stream", action="store_true", help="Process jobs in fixed-size chunks (bounded memory)")
+    parser.add_argument("--chunk-size", type=int, help="Jobs per chunk in streaming mode (default config.PIPELINE_CHUNK_SIZE)")
+    parser.add_argument("--workers", type=int, help="Processes annotating job descriptions (0 = one per CPU core, default config.SCORING_WORKERS)")
+    parser.add_argument("--profiles", nargs="+", metavar="NAME", help="Score these config.PROFILES in one pass (default: all configured)")
+    parser.add_argument("--profile-stage", help="Run one stage (e.g. annotate, vectorize, fetch) under cProfile; output goes to LOGS_DIR")
+    parser.add_argument("--engine", choices=sorted(ENGINE_NAMES), help="Ranking engine (default config.RANKING_ENGINE)")
+    parser.add_argument("--daemon", action="store_true", help="Stay resident and poll the feeds every --interval seconds")
+    parser.add_argument("--interval", type=float, help="Seconds between daemon polls (default config.DAEMON_POLL_INTERVAL)")
+    return parser.parse_args()
+
+def run_daemon(args):
+    """
+    Daemon mode: the first poll runs like a normal run (--refit-tfidf included), later polls only
+    process what changed. Status goes to config.DAEMON_STATUS_FILE.
+    """
+    def poll():
+        record = process_jobs(
+            refit_tfidf=args.refit_tfidf and daemon.status["polls"] == 0, profile_stage=args.profile_stage,
+            stream=args.stream or None, chunk_size=args.chunk_size, workers=args.workers,
+            profiles=args.profiles, rescore_cached=False, engine=args.engine
+        )
+        return {"seconds": record["seconds"], "counters": record["counters"]} if record else None
+
+    daemon = Daemon(poll, interval=args.interval)
+    daemon.install_signal_handlers()
+    daemon.run()
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        process_jobs()
+        if args.daemon:
+            run_daemon(args)
+        else:
+            process_jobs(
+                refit_tfidf=args.refit_tfidf, profile_stage=args.profile_stage,
+                stream=args.stream or None, chunk_size=args.chunk_size, workers=args.workers,
+                profiles=args.profiles, engine=args.engine
+            )
     finally:
+        shutdown_worker_pool()
         close_logger()
\ No newline at end of file
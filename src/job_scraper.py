@@ -1,50 +1,309 @@
-import requests
+import re
 import json
-import os
+import time
+import requests
+from requests.adapters import HTTPAdapter
 import config
+from job_store import get_job_store, utc_timestamp
+from utils import attach_clean_description
+from job_sources import (
+    JobSource, SourceFetchError, run_sources, merge_new_jobs, get_registered_sources
+)
+from metrics import span, count
 
+_session = None
+_json_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"\s*")
 
-def fetch_jobs_from_remotive():
-    """Fetches remote jobs from Remotive.io API and returns a list of jobs."""
-    response = requests.get(config.REMOTIVE_URL)
 
-    if response.status_code == 200:
-        jobs = response.json().get("jobs", [])
-        return jobs
-    else:
-        print(f"Error fetching jobs from Remotive.io: {response.status_code}")
-        return []
+def get_http_session():
+    """Returns the pooled requests.Session shared by every fetch (keeps connections alive)."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_SIZE, pool_maxsize=config.HTTP_POOL_SIZE)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+        _session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return _session
 
-def load_cached_jobs():
-    """Loads cached job listings from JSON file."""
-    if os.path.exists(config.CACHED_JOBS_FILE):
-        with open(config.CACHED_JOBS_FILE, "r", encoding="utf-8") as f:
+def iter_json_array_items(text_chunks, key):
+    """
+    Yields the items of the top-level `key` array of a JSON object while it is still downloading.
+    - Only the current chunk and the item being decoded are held in memory.
+    - Other top-level values (legal notice, job-count, ...) are decoded and skipped.
+    """
+    chunks = iter(text_chunks)
+    buffer, pos = "", 0
+
+    def read_more():
+        nonlocal buffer, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer, pos = buffer[pos:] + chunk, 0
+        return True
+
+    def next_char():
+        nonlocal pos
+        while True:
+            pos = _whitespace.match(buffer, pos).end()
+            if pos < len(buffer):
+                pos += 1
+                return buffer[pos - 1]
+            if not read_more():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def decode_value():
+        nonlocal pos
+        pos = _whitespace.match(buffer, pos).end()
+        while True:
             try:
-                return json.load(f)
+                value, end = _json_decoder.raw_decode(buffer, pos)
+                # A number ending exactly at the buffer end may continue in the next chunk
+                if end < len(buffer) or not isinstance(value, (int, float)) or not read_more():
+                    pos = end
+                    return value
             except json.JSONDecodeError:
-                return []  # Return empty if the cache file is corrupted
-    return []
-
-def save_jobs_to_cache(jobs):
-    """Saves the latest job listings to cache."""
-    with open(config.CACHED_JOBS_FILE, "w", encoding="utf-8") as f:
-        json.dump(jobs, f, indent=4)
-
-def get_new_jobs():
-    """Fetches new jobs from API and compares with cache to find fresh listings."""
-    fetched_jobs = fetch_jobs_from_remotive()
-    cached_jobs = load_cached_jobs()
-
-    # Convert cached jobs to a set of job URLs for easy comparison
-    cached_urls = {job["url"] for job in cached_jobs}
-    
-    # Filter out already cached jobs
-    new_jobs = [job for job in fetched_jobs if job["url"] not in cached_urls]
-
-    if new_jobs:
-        print(f"Found {len(new_jobs)} new jobs. Adding to Google Sheets...")
-        save_jobs_to_cache(fetched_jobs)  # Update cache with latest jobs
-    else:
-        print("No new jobs found.")
+                if not read_more():
+                    raise
+            pos = _whitespace.match(buffer, pos).end()
+
+    if next_char() != "{":
+        raise ValueError("Expected a JSON object")
+    if next_char() == "}":
+        return
+    pos -= 1
+
+    while True:
+        name = decode_value()
+        if next_char() != ":":
+            raise ValueError("Expected ':' after object key")
+
+        if name == key:
+            if next_char() != "[":
+                raise ValueError(f"Expected '{key}' to be an array")
+            if next_char() != "]":
+                pos -= 1
+                while True:
+                    yield decode_value()
+                    separator = next_char()
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise ValueError("Expected ',' or ']' in array")
+        else:
+            decode_value()
+
+        separator = next_char()
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError("Expected ',' or '}' in object")
+
+def fetch_jobs_from_remotive(url=None, params=None):
+    """
+    Fetches remote jobs from Remotive.io API as a conditional, streamed request.
+    - Returns (jobs, validators): jobs is a generator over the 'jobs' array, validators the new ETag/Last-Modified.
+    - Returns (None, None) when the feed is unchanged since the stored validators (HTTP 304).
+    - Raises SourceFetchError when the request fails or the status is neither 200 nor 304.
+    """
+    feed_url = remotive_feed_url(url, params)
+    validators = get_job_store().get_fetch_validators(feed_url)
+
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        response = get_http_session().get(feed_url, headers=headers, timeout=config.HTTP_TIMEOUT, stream=True)
+    except requests.RequestException as e:
+        print(f"Error fetching jobs from Remotive.io: {e}")
+        raise SourceFetchError(f"request failed: {e}") from e
+
+    if response.status_code == 304:
+        response.close()
+        return None, None
+
+    if response.status_code != 200:
+        print(f"Error fetching jobs from Remotive.io: {response.status_code}")
+        response.close()
+        raise SourceFetchError(f"HTTP {response.status_code}")
+
+    new_validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified")
+    }
+
+    def stream_jobs():
+        response.encoding = response.encoding or "utf-8"
+        try:
+            chunks = response.iter_content(chunk_size=config.HTTP_CHUNK_SIZE, decode_unicode=True)
+            yield from iter_json_array_items(chunks, "jobs")
+        finally:
+            # Bytes read off the wire (compressed size when the feed is gzipped)
+            raw = getattr(response, "raw", None)
+            if hasattr(raw, "tell"):
+                count("bytes_fetched", raw.tell())
+            response.close()
+
+    return stream_jobs(), new_validators
+
+def remotive_feed_url(url=None, params=None):
+    """Full URL of a Remotive query, used as its feed key in the job store."""
+    return requests.Request("GET", url or config.REMOTIVE_URL, params=params or {}).prepare().url
+
+
+class RemotiveSource(JobSource):
+    """One Remotive category/search query."""
+    name = "Remotive"
+
+    def __init__(self, params=None):
+        super().__init__(remotive_feed_url(params=params))
+        self.params = params or {}
+
+    def fetch(self, deadline):
+        return fetch_jobs_from_remotive(params=self.params)
+
 
+def load_cached_jobs():
+    """Loads the job listings from the latest fetch out of the job store (with clean descriptions)."""
+    with span("load_cached") as stage:
+        jobs = [attach_clean_description(job) for job in get_job_store().latest_jobs()]
+        stage.items = len(jobs)
+        return jobs
+
+def iter_cached_jobs(chunk_size):
+    """Chunked load_cached_jobs(): yields lists of at most chunk_size jobs from the latest fetch."""
+    for chunk in get_job_store().iter_latest_jobs(chunk_size):
+        yield [attach_clean_description(job) for job in chunk]
+
+
+
+class NewJobs:
+    """
+    The jobs one fetch stored for the first time, as returned by get_new_jobs(collect=False).
+    - Only their count is held; chunks() reads them back from the job store chunk_size at a time.
+    """
+
+    def __init__(self, after_rowid):
+        self.after_rowid = after_rowid  # JobStore.last_rowid() before the fetch
+        self._count = get_job_store().count_inserted_after(after_rowid)
+
+    def __len__(self):
+        return self._count
+
+    def chunks(self, chunk_size):
+        for chunk in get_job_store().iter_jobs_inserted_after(self.after_rowid, chunk_size):
+            yield [attach_clean_description(job) for job in chunk]
+
+
+def save_jobs_to_cache(jobs, seen_at=None, source="Remotive", feed=None):
+    """Upserts job listings into the job store (only new or changed jobs are rewritten)."""
+    return get_job_store().upsert_jobs(jobs, source=source, seen_at=seen_at, feed=feed)
+
+def _ingest_feed(source, fetched_jobs, validators, seen_at, deadline, collect=True):
+    """
+    Streams one source's jobs into the job store in batches and returns the ones not seen before.
+    - collect=False keeps none of them (NewJobs reads them back), so no job outlives its batch.
+    - Feed membership is settled (finish_feed) and validators are saved only once the whole feed is
+      stored; a partial feed raises SourceFetchError, keeps every listing and is refetched next run.
+    """
+    store = get_job_store()
+    new_jobs, batch = [], []
+    inserted = updated = 0
+
+    def flush(batch):
+        # Strip HTML once, right after fetch; every later stage reads job["clean_description"]
+        for job in batch:
+            attach_clean_description(job)
+
+        # Look up only the fetched URLs instead of loading the whole cache
+        cached_urls = store.existing_urls(job["url"] for job in batch)
+        fresh = (job for job in {job["url"]: job for job in batch}.values() if job["url"] not in cached_urls)
+        if collect:
+            new_jobs.extend(fresh)
+        return save_jobs_to_cache(batch, seen_at=seen_at, source=source.name, feed=source.feed_key)
+
+    try:
+        for job in fetched_jobs:
+            batch.append(job)
+            if len(batch) >= config.FETCH_UPSERT_BATCH_SIZE:
+                batch_inserted, batch_updated = flush(batch)
+                inserted, updated, batch = inserted + batch_inserted, updated + batch_updated, []
+                if time.monotonic() > deadline:
+                    raise TimeoutError("source timed out while streaming")
+        if batch:
+            batch_inserted, batch_updated = flush(batch)
+            inserted, updated = inserted + batch_inserted, updated + batch_updated
+    except (requests.RequestException, ValueError, TimeoutError) as e:
+        print(f"Error reading jobs from {source.name} {source.feed_key}: {e}")
+        # Keep what was stored, but a partial feed must not drop listings or save validators
+        raise SourceFetchError(f"partial feed: {e}", new_jobs) from e
+    finally:
+        if hasattr(fetched_jobs, "close"):
+            fetched_jobs.close()
+
+    store.finish_feed(source.feed_key, seen_at)
+    if validators and (validators.get("etag") or validators.get("last_modified")):
+        store.save_fetch_validators(source.feed_key, validators.get("etag"), validators.get("last_modified"))
+
+    count("jobs_inserted", inserted)
+    count("jobs_updated", updated)
+    print(f"{source.name} {source.feed_key}: {inserted} new, {updated} changed.")
     return new_jobs
+
+def get_sources():
+    """Sources fetched every run: the configured Remotive queries plus any registered source."""
+    return [RemotiveSource(params) for params in config.REMOTIVE_QUERIES] + get_registered_sources()
+
+def get_new_jobs(sources=None, collect=True):
+    """
+    Fetches all sources concurrently and checks the job store to find fresh listings.
+    - Streamed jobs are checked and upserted in batches, so only new jobs are kept in memory.
+    - New jobs are deduped by URL across sources before they reach process_jobs.
+    - collect=False returns a NewJobs instead, which reads the new jobs back from the job store in chunks.
+    - Returns None when no source brought anything (every feed unchanged or failed before storing a job):
+      nothing downstream needs to run, and a failed feed never counts as an empty one.
+    """
+    sources = get_sources() if sources is None else sources
+    store = get_job_store()
+    seen_at = utc_timestamp()
+    # Jobs inserted from here on are this fetch's new jobs (seen_at alone is not unique: it has one-second resolution)
+    last_rowid = store.last_rowid()
+
+    def ingest(source, jobs, validators, deadline):
+        with span("fetch_source") as stage:
+            new_jobs = _ingest_feed(source, jobs, validators, seen_at, deadline, collect=collect)
+            # Without collect, the jobs_inserted counter of this span tells how many were new
+            if collect:
+                stage.items = len(new_jobs)
+            return new_jobs
+
+    with span("fetch") as stage:
+        results = run_sources(sources, ingest)
+
+        # Unchanged feeds still count as seen in this fetch
+        for feed_key, result in results.items():
+            if result is None:
+                store.touch_feed(feed_key, seen_at)
+
+        failed = [feed_key for feed_key, result in results.items() if isinstance(result, SourceFetchError)]
+        if failed:
+            print(f"{len(failed)} of {len(results)} sources failed; their listings are kept until they load again.")
+
+        new_jobs = merge_new_jobs(results) if collect else NewJobs(last_rowid)
+
+        # Only fully read feeds can add or drop listings
+        if results and not new_jobs and all(result is None or feed_key in failed for feed_key, result in results.items()):
+            print("No source changed since the last fetch." if not failed else "No source could be read or changed.")
+            return None
+        stage.items = len(new_jobs)
+        if new_jobs:
+            print(f"Found {len(new_jobs)} new jobs. Adding to Google Sheets...")
+        else:
+            print("No new jobs found.")
+
+        return new_jobs
@@ -0,0 +1,153 @@
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+import config
+from logger import setup_logger
+
+logger = setup_logger("job_sources")
+
+_source_factories = []
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+
+class SourceFetchError(Exception):
+    """
+    A feed that could not be read completely (request error, unexpected status, stream error or timeout).
+    - new_jobs holds the new jobs stored before the failure, so they are still processed.
+    """
+
+    def __init__(self, message, new_jobs=()):
+        super().__init__(message)
+        self.new_jobs = list(new_jobs)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class HostLimiter:
+    """Per-host concurrency cap plus token-bucket rate limit."""
+
+    def __init__(self, max_concurrency, rate, burst):
+        self._slots = threading.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst)
+
+    def __enter__(self):
+        self._slots.acquire()
+        self._bucket.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+        return False
+
+
+def get_host_limiter(host):
+    """Returns the shared limiter of a host, creating it from config on first use."""
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = HostLimiter(
+                config.SOURCE_MAX_CONCURRENCY_PER_HOST, config.SOURCE_RATE_LIMIT_PER_HOST, config.SOURCE_RATE_BURST
+            )
+        return _host_limiters[host]
+
+
+class JobSource:
+    """
+    Base class of a pluggable job source.
+    - fetch(deadline) returns (jobs, validators): an iterable of Remotive-shaped job dicts and the
+      HTTP validators to remember, or (None, None) when the feed is unchanged since the last fetch.
+      It raises SourceFetchError when the feed cannot be read (never an empty iterable: that means an empty feed).
+    - feed_key identifies the feed in the job store (validators and feed membership).
+    """
+    name = "Source"
+
+    def __init__(self, feed_key):
+        self.feed_key = feed_key
+        self.host = urlparse(feed_key).netloc or feed_key
+
+    def fetch(self, deadline):
+        raise NotImplementedError
+
+
+def register_source(factory):
+    """Registers a callable returning extra JobSource instances for every run (usable as a decorator)."""
+    _source_factories.append(factory)
+    return factory
+
+def get_registered_sources():
+    """Instantiates the sources added with register_source()."""
+    sources = []
+    for factory in _source_factories:
+        sources.extend(factory())
+    return sources
+
+def run_sources(sources, ingest):
+    """
+    Fetches all sources concurrently and hands each result to ingest(source, jobs, validators, deadline).
+    - Each host is capped by its HostLimiter; each source gets config.SOURCE_TIMEOUT seconds.
+    - Returns {source.feed_key: ingest result}, with None for unchanged feeds and a SourceFetchError for
+      feeds that failed (its new_jobs are the jobs stored before the failure).
+    """
+    def fetch_one(source):
+        start = time.monotonic()
+        deadline = start + config.SOURCE_TIMEOUT
+        try:
+            with get_host_limiter(source.host):
+                jobs, validators = source.fetch(deadline)
+                if jobs is None:
+                    logger.info(f"{source.name} {source.feed_key}: not modified.")
+                    return None
+                result = ingest(source, jobs, validators, deadline)
+        except SourceFetchError as e:
+            logger.error(f"{source.name} {source.feed_key} failed: {e}")
+            return e
+        except Exception as e:
+            logger.error(f"{source.name} {source.feed_key} failed: {e}")
+            return SourceFetchError(str(e))
+        logger.info(f"{source.name} {source.feed_key}: ingested in {time.monotonic() - start:.2f} sec")
+        return result
+
+    if not sources:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(config.SOURCE_MAX_WORKERS, len(sources))) as executor:
+        results = executor.map(fetch_one, sources)
+        return {source.feed_key: result for source, result in zip(sources, results)}
+
+def source_new_jobs(result):
+    """New jobs of one run_sources() result (unchanged: none, failed: those stored before the failure)."""
+    if isinstance(result, SourceFetchError):
+        return result.new_jobs
+    return result or []
+
+def merge_new_jobs(results):
+    """Merges per-source new jobs, keeping the first job seen for every URL."""
+    merged = {}
+    for result in results.values():
+        for job in source_new_jobs(result):
+            merged.setdefault(job["url"], job)
+    return list(merged.values())
@@ -0,0 +1,313 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+import pytz
+import config
+from logger import setup_logger
+
+logger = setup_logger("job_store")
+
+# Fields attached to jobs in memory that are never persisted
+DERIVED_FIELDS = ("clean_description",)
+
+_store = None
+
+
+def utc_timestamp():
+    """UTC timestamp in the same format the Sheets writer uses."""
+    return datetime.now(pytz.timezone("UTC")).strftime("%Y-%m-%d %H:%M:%S")
+
+def _stored_job(job):
+    """The job record as stored: derived fields (the clean description) are rebuilt on read."""
+    return {key: value for key, value in job.items() if key not in DERIVED_FIELDS}
+
+def _content_hash(job):
+    """Stable hash of a job record, used to skip rewriting unchanged jobs."""
+    return hashlib.sha1(json.dumps(job, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    SQLite (WAL) store of every fetched job, keyed by URL.
+    - Upserts only rewrite new or changed jobs; unchanged ones just get last_seen bumped.
+    - first_seen / last_seen keep the history that the old cached_jobs.json overwrote.
+    """
+
+    def __init__(self, path=None, read_only=False):
+        self.path = path or config.JOB_STORE_FILE
+        self._lock = threading.Lock()
+
+        if read_only:
+            # Readers (the query API) never create, migrate or write the store
+            self._conn = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, check_same_thread=False)
+            return
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "url TEXT PRIMARY KEY, data TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "source TEXT NOT NULL, first_seen TEXT NOT NULL, last_seen TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_first_seen ON jobs (first_seen)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_last_seen ON jobs (last_seen)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feed_jobs ("
+            "feed TEXT NOT NULL, url TEXT NOT NULL, seen_at TEXT NOT NULL, PRIMARY KEY (feed, url))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_scores ("
+            "profile TEXT NOT NULL, url TEXT NOT NULL, score REAL NOT NULL, relevant INTEGER NOT NULL, "
+            "skills TEXT NOT NULL, scored_at TEXT NOT NULL, version INTEGER NOT NULL, PRIMARY KEY (profile, url))"
+        )
+        score_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(job_scores)")}
+        if "job_skills" not in score_columns:
+            self._conn.execute("ALTER TABLE job_scores ADD COLUMN job_skills TEXT NOT NULL DEFAULT '[]'")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_job_scores_version ON job_scores (version)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fetch_validators ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT)"
+        )
+        self._conn.commit()
+
+    def _known_hashes(self, urls):
+        """Returns {url: content_hash} for the URLs already in the store."""
+        urls = list(urls)
+        known = {}
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(self._conn.execute(
+                f"SELECT url, content_hash FROM jobs WHERE url IN ({placeholders})", chunk
+            ).fetchall())
+        return known
+
+    def existing_urls(self, urls):
+        """Returns the subset of urls that are already stored."""
+        with self._lock:
+            return set(self._known_hashes(urls))
+
+    def upsert_jobs(self, jobs, source="Remotive", seen_at=None, feed=None):
+        """
+        Inserts new jobs, rewrites changed ones and bumps last_seen on all of them.
+        - feed records which feed listed the jobs (see finish_feed / touch_feed).
+        Returns (inserted, updated) counts.
+        """
+        seen_at = seen_at or utc_timestamp()
+        jobs_by_url = {job["url"]: job for job in jobs}
+
+        with self._lock:
+            known = self._known_hashes(jobs_by_url)
+            inserts, updates, touches = [], [], []
+
+            for url, job in jobs_by_url.items():
+                job = _stored_job(job)
+                content_hash = _content_hash(job)
+                if url not in known:
+                    inserts.append((url, json.dumps(job), content_hash, source, seen_at, seen_at))
+                elif known[url] != content_hash:
+                    updates.append((json.dumps(job), content_hash, seen_at, url))
+                else:
+                    touches.append((seen_at, url))
+
+            self._conn.executemany(
+                "INSERT INTO jobs (url, data, content_hash, source, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?)",
+                inserts
+            )
+            self._conn.executemany("UPDATE jobs SET data = ?, content_hash = ?, last_seen = ? WHERE url = ?", updates)
+            self._conn.executemany("UPDATE jobs SET last_seen = ? WHERE url = ?", touches)
+            if feed:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO feed_jobs (feed, url, seen_at) VALUES (?, ?, ?)",
+                    [(feed, url, seen_at) for url in jobs_by_url]
+                )
+            self._conn.commit()
+
+        return len(inserts), len(updates)
+
+    def _select_jobs(self, where, params=()):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data FROM jobs WHERE {where}", params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def latest_jobs(self):
+        """Returns the jobs seen in the most recent fetch (what cached_jobs.json used to hold)."""
+        return self._select_jobs("last_seen = (SELECT MAX(last_seen) FROM jobs)")
+
+    def iter_latest_jobs(self, chunk_size):
+        """Yields latest_jobs() in lists of at most chunk_size jobs (one short query per chunk)."""
+        with self._lock:
+            (latest,) = self._conn.execute("SELECT MAX(last_seen) FROM jobs").fetchone()
+        last_rowid = 0
+        while latest is not None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, data FROM jobs WHERE last_seen = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (latest, last_rowid, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [json.loads(data) for _, data in rows]
+
+    def last_rowid(self):
+        """Rowid of the newest stored job (0 for an empty store); jobs inserted later get larger ones."""
+        with self._lock:
+            (rowid,) = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM jobs").fetchone()
+        return rowid
+
+    def count_inserted_after(self, rowid):
+        """Number of jobs stored for the first time after last_rowid() returned rowid."""
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE rowid > ?", (rowid,)).fetchone()
+        return total
+
+    def iter_jobs_inserted_after(self, rowid, chunk_size):
+        """Yields the jobs stored for the first time after last_rowid() returned rowid, in lists of at most chunk_size."""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, data FROM jobs WHERE rowid > ? ORDER BY rowid LIMIT ?", (rowid, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            rowid = rows[-1][0]
+            yield [json.loads(data) for _, data in rows]
+
+    def listed_urls(self, urls):
+        """Returns the subset of urls that some feed still lists (expired postings are left out)."""
+        urls = list(urls)
+        listed = set()
+        with self._lock:
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                listed.update(url for (url,) in self._conn.execute(
+                    f"SELECT DISTINCT url FROM feed_jobs WHERE url IN ({placeholders})", chunk
+                ).fetchall())
+        return listed
+
+    def jobs_first_seen_since(self, since):
+        """Returns jobs first fetched at or after the given 'YYYY-MM-DD HH:MM:SS' UTC timestamp."""
+        return self._select_jobs("first_seen >= ? ORDER BY first_seen", (since,))
+
+    def jobs_last_seen_since(self, since):
+        """Returns jobs still listed at or after the given 'YYYY-MM-DD HH:MM:SS' UTC timestamp."""
+        return self._select_jobs("last_seen >= ? ORDER BY last_seen", (since,))
+
+    def count(self):
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+        return total
+
+    def finish_feed(self, feed, seen_at):
+        """Drops feed membership rows not refreshed by the fetch made at seen_at."""
+        with self._lock:
+            self._conn.execute("DELETE FROM feed_jobs WHERE feed = ? AND seen_at != ?", (feed, seen_at))
+            self._conn.commit()
+
+    def touch_feed(self, feed, seen_at):
+        """Marks every job of an unchanged (HTTP 304) feed as seen again at seen_at."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET last_seen = ? WHERE url IN (SELECT url FROM feed_jobs WHERE feed = ?)", (seen_at, feed)
+            )
+            self._conn.execute("UPDATE feed_jobs SET seen_at = ? WHERE feed = ?", (seen_at, feed))
+            self._conn.commit()
+
+    def save_scores(self, profile, scored_jobs, scored_at=None):
+        """
+        Records the latest score of jobs for a profile: scored_jobs is [(url, score, relevant, skills, job_skills)].
+        - skills are the ones matched against the profile's resume, job_skills all the skills of the job.
+        - Every call gets a new version number, so readers can load just what changed (see scores_since).
+        """
+        scored_at = scored_at or utc_timestamp()
+        with self._lock:
+            (version,) = self._conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM job_scores").fetchone()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_scores (profile, url, score, relevant, skills, job_skills, scored_at, version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        profile, url, float(score), int(bool(relevant)), json.dumps(sorted(set(skills))),
+                        json.dumps(sorted(set(job_skills))), scored_at, version
+                    )
+                    for url, score, relevant, skills, job_skills in scored_jobs
+                ]
+            )
+            self._conn.commit()
+        return version
+
+    def score_version(self):
+        """Version of the latest save_scores() call (0 when nothing was scored yet)."""
+        with self._lock:
+            (version,) = self._conn.execute("SELECT COALESCE(MAX(version), 0) FROM job_scores").fetchone()
+        return version
+
+    def scores_since(self, version):
+        """
+        Returns the scores saved after `version` with the job fields the query API filters on
+        (the descriptions are not loaded).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.profile, s.url, s.score, s.relevant, s.skills, s.job_skills, s.scored_at, s.version, "
+                "json_extract(j.data, '$.title'), json_extract(j.data, '$.company_name'), "
+                "json_extract(j.data, '$.candidate_required_location'), json_extract(j.data, '$.category'), "
+                "COALESCE(json_extract(j.data, '$.job_type'), json_extract(j.data, '$.type')), "
+                "COALESCE(json_extract(j.data, '$.publication_date'), j.first_seen) "
+                "FROM job_scores s JOIN jobs j ON j.url = s.url WHERE s.version > ? ORDER BY s.version",
+                (version,)
+            ).fetchall()
+        keys = (
+            "profile", "url", "score", "relevant", "skills", "job_skills", "scored_at", "version",
+            "title", "company", "location", "category", "type", "posted"
+        )
+        return [dict(zip(keys, row)) for row in rows]
+
+    def get_fetch_validators(self, url):
+        """Returns the stored {"etag", "last_modified"} of a feed URL (empty if never fetched)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM fetch_validators WHERE url = ?", (url,)
+            ).fetchone()
+        return {"etag": row[0], "last_modified": row[1]} if row else {}
+
+    def save_fetch_validators(self, url, etag, last_modified):
+        """Stores the HTTP cache validators of a feed URL for the next conditional request."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fetch_validators (url, etag, last_modified) VALUES (?, ?, ?)",
+                (url, etag, last_modified)
+            )
+            self._conn.commit()
+
+    def migrate_json_cache(self, json_path=None):
+        """One-time import of the legacy cached_jobs.json; the file is renamed once imported."""
+        json_path = json_path or config.CACHED_JOBS_FILE
+        if not os.path.exists(json_path):
+            return 0
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            try:
+                jobs = json.load(f)
+            except json.JSONDecodeError:
+                jobs = []  # Nothing to recover from a corrupted cache file
+
+        inserted, _ = self.upsert_jobs(job for job in jobs if job.get("url"))
+        os.replace(json_path, f"{json_path}.migrated")
+        logger.info(f"Migrated {inserted} jobs from {json_path} into the job store.")
+        return inserted
+
+
+def get_job_store():
+    """Returns the process-wide job store, migrating the legacy JSON cache on first use."""
+    global _store
+    if _store is None:
+        _store = JobStore()
+        _store.migrate_json_cache()
+    return _store
@@ -1,125 +1,251 @@
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pytz
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
 import config
-from utils import clean_html
+from utils import job_text
+from sheets_sync import sync_rows, sync_ranked_rows, read_rows
+from leaderboard import get_leaderboard, save_leaderboard
+from job_store import get_job_store
+from api_scheduler import get_scheduler
+from metrics import span
 from logger import setup_logger
 
 
 logger = setup_logger("job_writer")
 
-def add_filtered_jobs_to_sheets(jobs, model_used="TF-IDF", batch_size=100, update_pool=False):
-    """Upserts job listings to Google Sheets in batches."""
-    logging.info("Connecting to Google Sheets...")
-
-    try:
+# Sheet layouts (1-based columns)
+JOB_POOL_URL_COLUMN = 5
+JOB_POOL_INSERT_ONLY_COLUMNS = (6,)  # Date Added
+JOB_POOL_HEADERS = [
+    "Job Title", "Company", "Location", "Job Description", "URL", "Date Added", "Job Portal", "Job Type",
+    "Job Category", "Model Used", "Duplicate Of"
+]
+RECOMMENDED_URL_COLUMN = 10
+RECOMMENDED_USER_COLUMNS = (6, 7, 8)  # AI Insights, Application Status, Follow-up Date are edited by hand
+RECOMMENDED_TOUCH_COLUMNS = (9,)  # Last Updated
+RECOMMENDED_HEADERS = [
+    "Job Title", "Company", "Location", "Job Description", "Relevance Score", "AI Insights",
+    "Application Status", "Follow-up Date", "Last Updated", "URL", "Job Portal", "Job Category",
+    "Job Type", "Model Used"
+]
+
+_sheets_session = None
+_sheets_session_lock = threading.Lock()
+_headers_checked = set()  # Worksheets whose header row was checked by this process
+
+
+class SheetsSession:
+    """
+    Authorized gspread client plus spreadsheet and worksheet handles, created once per process.
+    - gspread's AuthorizedSession keeps the HTTP connection pool alive and refreshes the
+      service-account token only when it has expired.
+    """
+
+    def __init__(self):
         creds = Credentials.from_service_account_file(config.SHEETS_CREDENTIALS_FILE, scopes=config.GOOGLE_SCOPES)
-        client = gspread.authorize(creds)
-        sheet = client.open(config.GOOGLE_SHEET_NAME)
-
-        job_pool = sheet.worksheet(config.JOB_POOL_SHEET_NAME)
-        recommended_jobs = sheet.worksheet(config.RECOMMENDED_JOBS_SHEET_NAME)
-
-        # Get current timestamp
-        current_time = datetime.now(pytz.timezone("UTC")).strftime("%Y-%m-%d %H:%M:%S")
-
-        # Step 1: Update Job Pool (if applicable)
-        if update_pool:
-            existing_jobs = job_pool.get_all_records()
-            existing_urls = {job["URL"]: idx + 2 for idx, job in enumerate(existing_jobs)}
-
-            pool_rows_to_add = []
-            pool_rows_to_update = []
-
+        self.client = gspread.authorize(creds)
+        self.spreadsheet = get_scheduler("sheets_read").call(self.client.open_by_key, config.SPREADSHEET_ID)
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    def worksheet(self, name, headers=None):
+        """
+        Returns a cached worksheet handle.
+        - A missing worksheet is created with the given header row (e.g. per-profile Recommended tabs).
+        """
+        with self._lock:
+            if name not in self._worksheets:
+                try:
+                    self._worksheets[name] = get_scheduler("sheets_read").call(self.spreadsheet.worksheet, name)
+                except gspread.WorksheetNotFound:
+                    if headers is None:
+                        raise
+                    logging.info(f"Creating worksheet '{name}'...")
+                    worksheet = get_scheduler("sheets_write").call(
+                        self.spreadsheet.add_worksheet, title=name, rows=1000, cols=len(headers)
+                    )
+                    get_scheduler("sheets_write").values_batch_update(
+                        self.spreadsheet, [{"range": f"'{name}'!A1", "values": [headers]}]
+                    )
+                    self._worksheets[name] = worksheet
+            return self._worksheets[name]
+
+
+def get_sheets_session():
+    """Returns the process-wide Sheets session, authorizing on first use."""
+    global _sheets_session
+    with _sheets_session_lock:
+        if _sheets_session is None:
+            logging.info("Connecting to Google Sheets...")
+            _sheets_session = SheetsSession()
+        return _sheets_session
+
+def _ensure_headers(session, worksheet, headers):
+    """Appends the header cells missing from row 1 (columns added after the sheet was created), once per process."""
+    if worksheet.title in _headers_checked:
+        return
+    current = get_scheduler("sheets_read").call(worksheet.row_values, 1)
+    if len(current) < len(headers):
+        logging.info(f"Adding headers {headers[len(current):]} to '{worksheet.title}'.")
+        get_scheduler("sheets_write").values_batch_update(session.spreadsheet, [{
+            "range": f"'{worksheet.title}'!{rowcol_to_a1(1, len(current) + 1)}", "values": [headers[len(current):]]
+        }])
+    _headers_checked.add(worksheet.title)
+
+def _description_cell(job):
+    """Clean description for the sheet ("N/A" when the job carries none)."""
+    if "description" not in job and "clean_description" not in job:
+        return "N/A"
+    return job_text(job)
+
+def _update_job_pool(session, jobs, model_used, current_time):
+    """Syncs job listings into the Job Pool sheet (changed cells and new rows only)."""
+    with span("sheets_job_pool", items=len(jobs)):
+        try:
+            rows_by_url = {}
             for job in jobs:
-                row_number = existing_urls.get(job.get("url"))
-                row_data = [
+                rows_by_url[job.get("url", "N/A")] = [
                     job.get("title", "N/A"),  # Job Title
                     job.get("company_name", "N/A"),  # Company
                     job.get("candidate_required_location", "N/A"),  # Location
-                    clean_html(job.get("description", "N/A")),  # Cleaned Job Description
+                    _description_cell(job),  # Cleaned Job Description
                     job.get("url", "N/A"),  # URL
                     current_time,  # Date Added
                     "Remotive",  # Job Portal
                     job.get("type", "N/A"),  # Job Type
                     job.get("category", "N/A"),  # Job Category
-                    model_used
+                    model_used,
+                    job.get("duplicate_of", "")  # Duplicate Of (canonical posting URL)
                 ]
 
-                if row_number:
-                    # Update existing job (collect rows to update)
-                    pool_rows_to_update.append((row_number, row_data))
-                else:
-                    # Add new job
-                    pool_rows_to_add.append(row_data)
-
-            # Batch Update Existing Rows in Job Pool
-            for start in range(0, len(pool_rows_to_update), batch_size):
-                batch = pool_rows_to_update[start:start + batch_size]
-                cell_range = f"A{batch[0][0]}:I{batch[-1][0]}"
-                batch_values = [row[1] for row in batch]
-                job_pool.update(cell_range, batch_values)
-                logging.info(f"Batch updated {len(batch)} existing jobs in 'Job Pool'.")
-
-            # Batch Add New Rows to Job Pool
-            for start in range(0, len(pool_rows_to_add), batch_size):
-                batch = pool_rows_to_add[start:start + batch_size]
-                job_pool.append_rows(batch, value_input_option="RAW")
-                logging.info(f"Batch added {len(batch)} new jobs to 'Job Pool'.")
-
-        # Step 2: Update Recommended Jobs
-        sorted_jobs = sorted(jobs, key=lambda x: float(x.get("score", 0)), reverse=True)[:config.TOP_N_JOBS]
-
-        # Fetch existing recommended jobs and their URLs
-        existing_recommended = recommended_jobs.get_all_records()
-        existing_recommended_urls = {job["URL"]: idx + 2 for idx, job in enumerate(existing_recommended)}
-
-        recommended_rows_to_add = []
-        recommended_rows_to_update = []
-
-        for job in sorted_jobs:
-            row_number = existing_recommended_urls.get(job.get("url"))
-            row_data = [
-                job.get("title", "N/A"),  # Job Title
-                job.get("company_name", "N/A"),  # Company
-                job.get("candidate_required_location", "N/A"),  # Location
-                clean_html(job.get("description", "N/A")), 
-                float(job.get("score", 0)),  # Relevance Score
-                "",  # Placeholder for AI Insights
-                "",  # Placeholder for Application Status
-                "",  # Placeholder for Follow-up Date
-                current_time,  # Last Updated
-                job.get("url", "N/A"),  # URL
-                "Remotive",  # Job Portal
-                job.get("category", "N/A"),  # Job Category
-                job.get("type", "N/A"), # Job Type
-                model_used
-            ]
-
-            if row_number:
-                # Update existing recommended job
-                recommended_rows_to_update.append((row_number, row_data))
-            else:
-                # Add new recommended job
-                recommended_rows_to_add.append(row_data)
-
-        # Batch Update Existing Recommended Jobs
-        for start in range(0, len(recommended_rows_to_update), batch_size):
-            batch = recommended_rows_to_update[start:start + batch_size]
-            cell_range = f"A{batch[0][0]}:N{batch[-1][0]}"
-            batch_values = [row[1] for row in batch]
-            recommended_jobs.update(cell_range, batch_values)
-            logging.info(f"Batch updated {len(batch)} existing jobs in 'Recommended Jobs'.")
-
-        # Batch Add New Recommended Jobs
-        for start in range(0, len(recommended_rows_to_add), batch_size):
-            batch = recommended_rows_to_add[start:start + batch_size]
-            recommended_jobs.append_rows(batch, value_input_option="RAW")
-            logging.info(f"Batch added {len(batch)} new recommended jobs to 'Recommended Jobs'.")
+            job_pool = session.worksheet(config.JOB_POOL_SHEET_NAME, headers=JOB_POOL_HEADERS)
+            _ensure_headers(session, job_pool, JOB_POOL_HEADERS)
+            updated, added = sync_rows(
+                session.spreadsheet, job_pool, JOB_POOL_URL_COLUMN, rows_by_url,
+                insert_only_columns=JOB_POOL_INSERT_ONLY_COLUMNS
+            )
+            logging.info(f"Updated {updated} and added {added} jobs in 'Job Pool'.")
+        except Exception as e:
+            logging.error(f"Error updating '{config.JOB_POOL_SHEET_NAME}': {e}")
+
+def _seed_leaderboard(board, worksheet):
+    """Fills a board never saved before with the rows already on its sheet (URL, Relevance Score and job cells)."""
+    seeded = 0
+    for url, values in read_rows(worksheet, RECOMMENDED_URL_COLUMN, len(RECOMMENDED_HEADERS)):
+        try:
+            score = float(values[4])  # Relevance Score
+        except ValueError:
+            continue
+        # Title, Company, Location, Description, Category, Type, Model
+        board.push(url, score, values[:4] + values[11:14])
+        seeded += 1
+    return seeded
+
+def _update_recommended_jobs(session, jobs, model_used, current_time, sheet_name=None):
+    """
+    Offers the scored jobs to the sheet's persisted top-N leaderboard and syncs the sheet to it.
+    - The sheet always shows the best TOP_N_JOBS jobs across runs, in rank order; only moved or changed rows are written.
+    - A board never saved before (first run after an upgrade) is seeded from the rows already on the sheet.
+    - Jobs no feed lists anymore (expired postings) leave the board and the reserve below the cut backfills them;
+      an empty listing expires nothing.
+    - Rows with hand-edited cells (status, follow-up) that leave the ranks stay on the sheet, pinned below them.
+    - Jobs without a score (raw listings on the Job Pool write) are ignored.
+    """
+    sheet_name = sheet_name or config.RECOMMENDED_JOBS_SHEET_NAME
+    with span("sheets_recommended", items=len(jobs)):
+        try:
+            board = get_leaderboard(sheet_name)
+            recommended_jobs = session.worksheet(sheet_name, headers=RECOMMENDED_HEADERS)
+            if not board.persisted:
+                seeded = _seed_leaderboard(board, recommended_jobs)
+                if seeded:
+                    logging.info(f"Seeded the '{sheet_name}' leaderboard with {seeded} rows already on the sheet.")
+
+            listed = get_job_store().listed_urls(board.urls())
+            # No feed membership at all (failed fetch, migrated store) proves nothing: expire only against a real listing
+            if listed:
+                expired = board.expire(listed)
+                if expired:
+                    logging.info(f"{len(expired)} expired jobs left '{sheet_name}'.")
 
+            for job in jobs:
+                if "score" not in job:
+                    continue
+                board.push(job.get("url", "N/A"), job["score"], [
+                    job.get("title", "N/A"),  # Job Title
+                    job.get("company_name", "N/A"),  # Company
+                    job.get("candidate_required_location", "N/A"),  # Location
+                    _description_cell(job),  # Cleaned Job Description
+                    job.get("category", "N/A"),  # Job Category
+                    job.get("type", "N/A"),  # Job Type
+                    model_used
+                ])
+            save_leaderboard(board)
+
+            ranked_rows = []
+            for url, score, (title, company, location, description, category, job_type, model) in board.ranked(config.TOP_N_JOBS):
+                ranked_rows.append((url, [
+                    title, company, location, description,
+                    score,  # Relevance Score
+                    "",  # Placeholder for AI Insights
+                    "",  # Placeholder for Application Status
+                    "",  # Placeholder for Follow-up Date
+                    current_time,  # Last Updated
+                    url,  # URL
+                    "Remotive",  # Job Portal
+                    category,  # Job Category
+                    job_type,  # Job Type
+                    model
+                ]))
+
+            written, cleared = sync_ranked_rows(
+                session.spreadsheet, recommended_jobs, RECOMMENDED_URL_COLUMN, ranked_rows, len(RECOMMENDED_HEADERS),
+                user_columns=RECOMMENDED_USER_COLUMNS, touch_columns=RECOMMENDED_TOUCH_COLUMNS
+            )
+            logging.info(f"Wrote {written} and cleared {cleared} rows in '{sheet_name}'.")
+        except Exception as e:
+            logging.error(f"Error updating '{sheet_name}': {e}")
+
+def add_jobs_to_pool(jobs, model_used="TF-IDF"):
+    """Upserts job listings to the Job Pool sheet only (used per chunk by the streaming pipeline)."""
+    try:
+        session = get_sheets_session()
     except Exception as e:
         logging.error(f"Error accessing Google Sheets: {e}")
+        return
+
+    current_time = datetime.now(pytz.timezone("UTC")).strftime("%Y-%m-%d %H:%M:%S")
+    _update_job_pool(session, jobs, model_used, current_time)
+
+def add_filtered_jobs_to_sheets(jobs, model_used="TF-IDF", pool_jobs=None, sheet_name=None):
+    """
+    Upserts job listings to Google Sheets.
+    - jobs (the ranked ones) go to the Recommended Jobs tab selected by sheet_name
+      (default config.RECOMMENDED_JOBS_SHEET_NAME), once per run.
+    - pool_jobs (the run's new jobs), if given, go to the Job Pool concurrently with that write.
+    - Reuses the cached Sheets session.
+    - Each sheet gets a single batch update holding only its changed cells and new rows.
+    """
+    try:
+        session = get_sheets_session()
+    except Exception as e:
+        logging.error(f"Error accessing Google Sheets: {e}")
+        return
+
+    # Get current timestamp
+    current_time = datetime.now(pytz.timezone("UTC")).strftime("%Y-%m-%d %H:%M:%S")
+
+    if not pool_jobs:
+        _update_recommended_jobs(session, jobs, model_used, current_time, sheet_name)
+        return
 
+    # The two sheets are independent, so both writes go out at the same time
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        executor.submit(_update_job_pool, session, pool_jobs, model_used, current_time)
+        executor.submit(_update_recommended_jobs, session, jobs, model_used, current_time, sheet_name)
@@ -0,0 +1,150 @@
+import os
+import json
+import heapq
+import threading
+import config
+from logger import setup_logger
+
+logger = setup_logger("leaderboard")
+
+_boards = {}
+_boards_lock = threading.Lock()
+
+
+class Leaderboard:
+    """
+    Persisted, bounded min-heap of the best-scoring jobs, keyed by URL.
+    - push() is O(log N): a new score either takes a free slot or displaces the current minimum.
+    - A re-scored job replaces its old entry (the stale heap item is skipped lazily).
+    - Equal scores keep the job that entered first, like a stable sort.
+    - persisted is False for a board never saved before (the caller may seed it from the sheet).
+    """
+
+    def __init__(self, name, capacity, entries=None, seq=0):
+        self.name = name
+        self.capacity = capacity
+        self.entries = entries or {}  # url -> {"score", "seq", "job"}
+        self.persisted = entries is not None
+        self._seq = seq
+        self._heap = [(entry["score"], -entry["seq"], url) for url, entry in self.entries.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def urls(self):
+        return list(self.entries)
+
+    def _is_live(self, item):
+        score, neg_seq, url = item
+        entry = self.entries.get(url)
+        return entry is not None and entry["seq"] == -neg_seq and entry["score"] == score
+
+    def _pop_min(self):
+        """Removes and returns the URL of the lowest live entry."""
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if self._is_live(item):
+                del self.entries[item[2]]
+                return item[2]
+        return None
+
+    def _min_item(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def push(self, url, score, job):
+        """
+        Offers a scored job. Returns the URL it displaced, the job's own URL if it did not make the board,
+        or None if nothing left the board.
+        """
+        score = float(score)
+        entry = self.entries.get(url)
+        if entry is not None:
+            # Score update: keep the original entry order for ties
+            if entry["score"] != score:
+                entry["score"] = score
+                heapq.heappush(self._heap, (score, -entry["seq"], url))
+            entry["job"] = job
+            self._compact()
+            return None
+
+        seq = self._seq
+        if len(self.entries) >= self.capacity:
+            lowest = self._min_item()
+            # Ties go to the job already on the board
+            if lowest is not None and score <= lowest[0]:
+                return url
+        self._seq += 1
+        self.entries[url] = {"score": score, "seq": seq, "job": job}
+        heapq.heappush(self._heap, (score, -seq, url))
+
+        displaced = self._pop_min() if len(self.entries) > self.capacity else None
+        self._compact()
+        return displaced
+
+    def remove(self, url):
+        """Drops a job (e.g. an expired posting); its heap item becomes stale."""
+        return self.entries.pop(url, None) is not None
+
+    def expire(self, active_urls):
+        """Drops every job whose URL is not in active_urls. Returns the dropped URLs."""
+        expired = [url for url in self.entries if url not in active_urls]
+        for url in expired:
+            self.remove(url)
+        self._compact()
+        return expired
+
+    def _compact(self):
+        """Rebuilds the heap once stale items outnumber live ones."""
+        if len(self._heap) > 2 * len(self.entries) + self.capacity:
+            self._heap = [(entry["score"], -entry["seq"], url) for url, entry in self.entries.items()]
+            heapq.heapify(self._heap)
+
+    def ranked(self, limit=None):
+        """Returns [(url, score, job)] best first (at most `limit` of them)."""
+        ordered = sorted(self.entries.items(), key=lambda item: (-item[1]["score"], item[1]["seq"]))[:limit]
+        return [(url, entry["score"], entry["job"]) for url, entry in ordered]
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "seq": self._seq, "entries": self.entries}
+
+
+def _load_all(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable leaderboard file, boards start empty: {e}")
+        return {}
+
+def get_leaderboard(name, capacity=None):
+    """
+    Returns the persisted leaderboard of a sheet, loading it on first use.
+    - The default capacity is TOP_N_JOBS plus LEADERBOARD_RESERVE backfill entries.
+    - A smaller capacity (e.g. TOP_N_JOBS lowered) evicts the lowest entries right away.
+    """
+    capacity = capacity or config.TOP_N_JOBS + config.LEADERBOARD_RESERVE
+    with _boards_lock:
+        if name not in _boards:
+            stored = _load_all(config.LEADERBOARD_FILE).get(name, {})
+            _boards[name] = Leaderboard(name, capacity, stored.get("entries"), stored.get("seq", 0))
+        board = _boards[name]
+        board.capacity = capacity
+        while len(board) > capacity:
+            board._pop_min()
+        return board
+
+def save_leaderboard(board):
+    """Writes a leaderboard back (every board shares one JSON file under DATA_DIR)."""
+    with _boards_lock:
+        boards = _load_all(config.LEADERBOARD_FILE)
+        boards[board.name] = board.to_dict()
+        tmp_path = f"{config.LEADERBOARD_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(boards, f)
+        os.replace(tmp_path, config.LEADERBOARD_FILE)
+        board.persisted = True
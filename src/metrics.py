@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import config
+from logger import setup_logger
+
+logger = setup_logger("metrics")
+
+_run = None
+_local = threading.local()
+_profile_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process so far (None where the resource module is missing, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Span:
+    """One timed stage. `items` and counters (bytes, API calls, cache hits...) are filled in by the code inside it."""
+
+    def __init__(self, name, items=None):
+        self.name = name
+        self.items = items
+        self.counters = {}
+        self.seconds = None
+        self.peak_rss_mb = None
+
+    def count(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+
+class _Run:
+    def __init__(self, profile_stage):
+        self.started = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.profile_stage = profile_stage
+        self.spans = []
+        self.counters = {}  # Counts made outside any span
+        self.lock = threading.Lock()
+
+
+def start_run(profile_stage=None):
+    """
+    Starts recording spans for one pipeline run (until finish_run()).
+    - Without an active run span() only times the block and count() does nothing.
+    - profile_stage names a span to run under cProfile; the stats are dumped to LOGS_DIR.
+    """
+    global _run
+    _run = _Run(profile_stage or config.PROFILE_STAGE)
+
+def _current_span():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+@contextmanager
+def span(name, items=None):
+    """Times a stage; counts made inside it (in the same thread) are attached to it."""
+    current = Span(name, items)
+    run = _run
+    if run is None:
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            current.seconds = time.perf_counter() - start
+        return
+
+    profiler = None
+    if run.profile_stage == name and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(current)
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield current
+    finally:
+        if profiler:
+            profiler.disable()
+            _profile_lock.release()
+        current.seconds = time.perf_counter() - start
+        current.peak_rss_mb = peak_rss_mb()
+        stack.pop()
+        with run.lock:
+            run.spans.append(current)
+        if profiler:
+            _dump_profile(profiler, name)
+
+def count(key, n=1):
+    """Adds n to a counter of the innermost span of this thread (or of the run)."""
+    run = _run
+    if run is None:
+        return
+    current = _current_span()
+    if current is not None:
+        current.count(key, n)
+    else:
+        with run.lock:
+            run.counters[key] = run.counters.get(key, 0) + n
+
+def _dump_profile(profiler, name):
+    """Writes the stage's cProfile stats (.prof, for snakeviz / flameprof / gprof2dot) plus a text summary."""
+    stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    path = os.path.join(config.LOGS_DIR, f"profile_{name}_{stamp}.prof")
+    profiler.dump_stats(path)
+    with open(f"{path[:-5]}.txt", "w", encoding="utf-8") as f:
+        pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+    logger.info(f"Profile of stage '{name}' written to {path}")
+
+def finish_run(**fields):
+    """
+    Ends the run and appends its metrics record (one JSON line) to config.METRICS_FILE.
+    Spans are aggregated by name: total seconds, calls, items, counters and peak RSS at the end of the stage.
+    """
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return None
+
+    stages, totals = {}, dict(run.counters)
+    for s in run.spans:
+        stage = stages.setdefault(s.name, {"seconds": 0.0, "calls": 0, "items": 0})
+        stage["seconds"] += s.seconds
+        stage["calls"] += 1
+        stage["items"] += s.items or 0
+        stage["peak_rss_mb"] = s.peak_rss_mb
+        for key, n in s.counters.items():
+            stage[key] = stage.get(key, 0) + n
+            totals[key] = totals.get(key, 0) + n
+
+    for stage in stages.values():
+        stage["seconds"] = round(stage["seconds"], 4)
+
+    record = {
+        "started": run.started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "seconds": round(time.perf_counter() - run.start, 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+        "counters": totals,
+        **fields
+    }
+    try:
+        with open(config.METRICS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.error(f"Could not write metrics record: {e}")
+    return record
@@ -0,0 +1,60 @@
+import os
+import threading
+import spacy
+import config
+
+_models = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _model_key(name, exclude, disable):
+    name = name or config.NLP_MODEL
+    exclude = tuple(sorted(config.NLP_EXCLUDED_PIPES if exclude is None else exclude))
+    return name, exclude, tuple(sorted(disable or ()))
+
+def get_nlp(name=None, exclude=None, disable=None):
+    """
+    Returns a shared spaCy pipeline, loading it on first use.
+    - exclude defaults to config.NLP_EXCLUDED_PIPES; disable keeps components loaded but off.
+    - Every caller asking for the same model and components gets the same instance.
+    """
+    key = _model_key(name, exclude, disable)
+    with _registry_lock:
+        if key in _models:
+            return _models[key]
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    # Loading happens outside the registry lock; concurrent callers wait for the same load
+    with load_lock:
+        if key not in _models:
+            model_name, model_exclude, model_disable = key
+            print(f"Loading NLP Model {model_name}...")
+            nlp = spacy.load(model_name, exclude=list(model_exclude), disable=list(model_disable))
+            with _registry_lock:
+                _models[key] = nlp
+    return _models[key]
+
+def prewarm(name=None, exclude=None, disable=None):
+    """Loads a model in a background thread (e.g. while the Remotive fetch is in flight)."""
+    thread = threading.Thread(target=get_nlp, args=(name, exclude, disable), name="nlp-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def model_id(name=None):
+    """
+    Identifies a model by name and version without loading it when possible.
+    Used in cache keys so cache hits never pay for a model load.
+    """
+    name = name or config.NLP_MODEL
+    with _registry_lock:
+        loaded = next((nlp for (model_name, _, _), nlp in _models.items() if model_name == name), None)
+
+    if loaded is not None:
+        meta = loaded.meta
+    elif os.path.isdir(name):
+        meta = spacy.util.load_meta(os.path.join(name, "meta.json"))
+    else:
+        # Installed package, e.g. en_core_web_md -> "en_core_web_md-3.7.1"
+        return f"{name}-{spacy.util.get_package_version(name) or '0'}"
+    return f"{meta.get('lang', 'xx')}_{meta.get('name', 'pipeline')}-{meta.get('version', '0')}"
@@ -0,0 +1,38 @@
+import config
+
+DEFAULT_PROFILE = "default"  # Name of the single profile used when config.PROFILES is empty
+
+
+def load_profiles(names=None):
+    """
+    Returns the configured candidate profiles with defaults filled in.
+    - names restricts (and orders) the profiles; an unknown name raises ValueError.
+    - With no PROFILES configured, returns the single default profile (IDEAL_JOB_DESC, RESUME_FILE,
+      Recommended Jobs sheet).
+    """
+    if not config.PROFILES:
+        profiles = [{
+            "name": DEFAULT_PROFILE,
+            "ideal_job_desc": config.IDEAL_JOB_DESC,
+            "resume_file": config.RESUME_FILE,
+            "sheet_name": config.RECOMMENDED_JOBS_SHEET_NAME
+        }]
+    else:
+        profiles = [
+            {
+                "name": profile["name"],
+                "ideal_job_desc": profile.get("ideal_job_desc", config.IDEAL_JOB_DESC),
+                "resume_file": profile.get("resume_file", config.RESUME_FILE),
+                "sheet_name": profile.get("sheet_name", f"{config.RECOMMENDED_JOBS_SHEET_NAME} - {profile['name']}")
+            }
+            for profile in config.PROFILES
+        ]
+
+    if names is None:
+        return profiles
+
+    by_name = {profile["name"]: profile for profile in profiles}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown profile(s): {', '.join(unknown)}. Configured: {', '.join(by_name)}")
+    return [by_name[name] for name in names]
@@ -0,0 +1,313 @@
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import config
+from job_store import JobStore
+from profiles import DEFAULT_PROFILE
+from logger import setup_logger
+
+logger = setup_logger("query_api")
+
+# Query parameters matched against a secondary index: {parameter: field}
+INDEXED_FILTERS = {"skill": "job_skills", "category": "category", "type": "type", "location": "location"}
+_LOCATION_SEPARATORS = re.compile(r"[,/;|]")
+_UNKNOWN_DAY = np.iinfo(np.int32).min
+
+
+def _index_keys(field, doc):
+    """Lowercase keys a job is indexed under for a field (locations are split into their parts)."""
+    if field == "job_skills":
+        return {skill.lower() for skill in doc["job_skills"]}
+    value = doc.get(field) or ""
+    if field == "location":
+        return {part.strip().lower() for part in _LOCATION_SEPARATORS.split(value) if part.strip()}
+    return {value.lower()} if value else set()
+
+def _day_number(date_text):
+    """Days since 1970-01-01 of a 'YYYY-MM-DD...' date (ValueError on anything else)."""
+    return int(np.datetime64(date_text[:10], "D").astype(np.int64))
+
+
+class _ProfileIndex:
+    """
+    Column arrays (score, posted day, relevant, alive) plus postings per indexed field for one profile.
+    - Rows are append-only: a re-scored job gets a new row and its old row is marked dead.
+    - The arrays grow by doubling, so a refresh costs O(changed jobs), not O(all jobs).
+    """
+
+    def __init__(self):
+        self.docs = []
+        self.row_of = {}
+        self.postings = {field: {} for field in INDEXED_FILTERS.values()}  # field -> key -> [rows]
+        self._posting_arrays = {}  # (field, key) -> np.ndarray, dropped when the posting list grows
+        self.scores = np.zeros(1024, dtype=np.float32)
+        self.posted = np.zeros(1024, dtype=np.int32)
+        self.relevant = np.zeros(1024, dtype=bool)
+        self.alive = np.zeros(1024, dtype=bool)
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def _grow(self):
+        for name in ("scores", "posted", "relevant", "alive"):
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def add(self, doc):
+        """Adds (or replaces) a scored job."""
+        old_row = self.row_of.get(doc["url"])
+        if old_row is not None:
+            self.alive[old_row] = False
+
+        row = len(self.docs)
+        if row >= len(self.scores):
+            self._grow()
+        self.docs.append(doc)
+        self.row_of[doc["url"]] = row
+        self.scores[row] = doc["score"]
+        self.relevant[row] = doc["relevant"]
+        self.alive[row] = True
+        try:
+            self.posted[row] = _day_number(doc["posted"] or "")
+        except ValueError:
+            self.posted[row] = _UNKNOWN_DAY
+
+        for field, postings in self.postings.items():
+            for key in _index_keys(field, doc):
+                postings.setdefault(key, []).append(row)
+                self._posting_arrays.pop((field, key), None)
+
+    def compacted(self):
+        """A copy holding only the live rows."""
+        index = _ProfileIndex()
+        for row in sorted(self.row_of.values()):
+            index.add(self.docs[row])
+        return index
+
+    def rows_for(self, field, key):
+        """Row ids (live or dead) indexed under a key, as a cached array."""
+        cache_key = (field, key)
+        if cache_key not in self._posting_arrays:
+            self._posting_arrays[cache_key] = np.array(self.postings[field].get(key, []), dtype=np.int64)
+        return self._posting_arrays[cache_key]
+
+    def query(self, filters, min_score, max_score, since, until, relevant_only, offset, limit):
+        """Returns (total matches, docs of the requested page), best score first."""
+        n = len(self.docs)
+        mask = self.alive[:n].copy()
+        for field, keys in filters:
+            for key in keys:
+                matches = np.zeros(n, dtype=bool)
+                matches[self.rows_for(field, key)] = True
+                mask &= matches
+        if min_score is not None:
+            mask &= self.scores[:n] >= min_score
+        if max_score is not None:
+            mask &= self.scores[:n] <= max_score
+        if since is not None:
+            mask &= self.posted[:n] >= since
+        if until is not None:
+            mask &= (self.posted[:n] <= until) & (self.posted[:n] != _UNKNOWN_DAY)
+        if relevant_only:
+            mask &= self.relevant[:n]
+
+        candidates = np.flatnonzero(mask)
+        total = len(candidates)
+        window = min(offset + limit, total)
+        if window == 0:
+            return total, []
+
+        # Top-K without sorting every match: partition out the first offset + limit, then sort just those
+        negated = -self.scores[candidates]
+        if window < total:
+            selected = np.argpartition(negated, window - 1)[:window]
+            candidates, negated = candidates[selected], negated[selected]
+        page = candidates[np.lexsort((candidates, negated))][offset:window]
+        return total, [self.docs[row] for row in page]
+
+
+class JobQueryIndex:
+    """
+    In-memory query index over the scores recorded by process_jobs (see JobStore.save_scores).
+    - refresh() only loads the scores saved since the last refresh.
+    - Queries and refreshes are serialized by one lock.
+    - The store is opened read-only: the pipeline (process_jobs) owns its schema and writes.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or JobStore(read_only=True)
+        self.profiles = {}
+        self.version = 0
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Loads newly scored jobs; returns how many were loaded."""
+        with self._lock:
+            rows = self.store.scores_since(self.version)
+            for row in rows:
+                profile = row.pop("profile")
+                if profile not in self.profiles:
+                    self.profiles[profile] = _ProfileIndex()
+                self.version = max(self.version, row.pop("version"))
+                row["skills"] = json.loads(row["skills"])
+                row["job_skills"] = json.loads(row["job_skills"])
+                row["relevant"] = bool(row["relevant"])
+                self.profiles[profile].add(row)
+
+            # Re-scored jobs leave dead rows behind; rebuild a profile once they outnumber the live ones
+            for profile, index in self.profiles.items():
+                if len(index.docs) > 2 * len(index) + 1024:
+                    self.profiles[profile] = index.compacted()
+            self.refreshed_at = time.time()
+        if rows:
+            logger.info(f"Query index refreshed: {len(rows)} scored jobs loaded (version {self.version}).")
+        return len(rows)
+
+    def refresh_if_stale(self, max_age=None):
+        """Refreshes when the last check is older than max_age seconds and the store has newer scores."""
+        max_age = config.QUERY_API_REFRESH_INTERVAL if max_age is None else max_age
+        if self.refreshed_at is not None and time.time() - self.refreshed_at < max_age:
+            return 0
+        if self.store.score_version() == self.version:
+            self.refreshed_at = time.time()
+            return 0
+        return self.refresh()
+
+    def query(self, profile=DEFAULT_PROFILE, skills=(), categories=(), types=(), locations=(), min_score=None,
+              max_score=None, since=None, until=None, relevant_only=False, offset=0, limit=20):
+        """
+        Returns {"total", "offset", "limit", "jobs"} for the jobs of a profile matching every filter.
+        - skills / categories / types / locations are case-insensitive exact matches; all given values must match.
+        - skills match any skill of the job, not only the ones it shares with the profile's resume.
+        - since / until are inclusive 'YYYY-MM-DD' bounds on the posting date.
+        """
+        filters = [
+            (field, [value.lower() for value in values])
+            for field, values in (("job_skills", skills), ("category", categories), ("type", types), ("location", locations))
+            if values
+        ]
+        since = _day_number(since) if since else None
+        until = _day_number(until) if until else None
+        with self._lock:
+            index = self.profiles.get(profile)
+            if index is None:
+                total, jobs = 0, []
+            else:
+                total, jobs = index.query(filters, min_score, max_score, since, until, relevant_only, offset, limit)
+        return {"total": total, "offset": offset, "limit": limit, "jobs": jobs}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "profiles": {name: len(index) for name, index in self.profiles.items()},
+                "refreshed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.refreshed_at)) if self.refreshed_at else None
+            }
+
+
+def _parse_query(query_string):
+    """Turns /jobs query parameters into JobQueryIndex.query() arguments (ValueError on bad input)."""
+    params = parse_qs(query_string)
+
+    def last(name, default=None):
+        return params[name][-1] if name in params else default
+
+    limit = int(last("limit", last("k", 20)))
+    offset = int(last("offset", 0))
+    if not 0 < limit <= config.QUERY_API_MAX_LIMIT or offset < 0:
+        raise ValueError(f"limit must be 1-{config.QUERY_API_MAX_LIMIT} and offset >= 0")
+
+    kwargs = {
+        "profile": last("profile", DEFAULT_PROFILE),
+        "skills": params.get("skill", []), "categories": params.get("category", []),
+        "types": params.get("type", []), "locations": params.get("location", []),
+        "min_score": float(last("min_score")) if "min_score" in params else None,
+        "max_score": float(last("max_score")) if "max_score" in params else None,
+        "since": last("since"), "until": last("until"),
+        "relevant_only": last("relevant", "false").lower() in ("1", "true", "yes"),
+        "offset": offset, "limit": limit
+    }
+    for name in ("since", "until"):
+        if kwargs[name]:
+            _day_number(kwargs[name])
+    return kwargs
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Read-only JSON endpoints:
+    - GET /jobs?skill=&category=&type=&location=&min_score=&max_score=&since=&until=&relevant=&profile=&limit=&offset=
+      (k= is an alias of limit for top-K queries)
+    - GET /health
+    """
+
+    index = None  # Set by serve()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            self.index.refresh_if_stale()
+        except Exception as e:
+            logger.error(f"Query index refresh failed, serving the previous data: {e}")
+
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok", **self.index.stats()})
+        elif url.path == "/jobs":
+            try:
+                kwargs = _parse_query(url.query)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            start = time.perf_counter()
+            result = self.index.query(**kwargs)
+            result["query_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self._send_json(200, result)
+        else:
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+def serve(host=None, port=None):
+    """Serves the query API until interrupted."""
+    host = host or config.QUERY_API_HOST
+    port = port or config.QUERY_API_PORT
+    QueryHandler.index = JobQueryIndex()
+    QueryHandler.index.refresh()
+
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    logger.info(f"Query API listening on http://{host}:{server.server_port}")
+    print(f"Query API listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Read-only HTTP query API over the scored jobs.")
+    parser.add_argument("--host", help="Interface to bind (default config.QUERY_API_HOST)")
+    parser.add_argument("--port", type=int, help="Port to listen on (default config.QUERY_API_PORT)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    serve(args.host, args.port)
@@ -1,13 +1,33 @@
 import fitz  # PyMuPDF for PDFs
 import docx  # python-docx for DOCX
 import os
+from concurrent.futures import ProcessPoolExecutor
 import config
 
+def _extract_pdf_pages(pdf_path, first_page, last_page):
+    """Extracts the text of pages [first_page, last_page) (runs in a worker process)."""
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_number].get_text("text") for page_number in range(first_page, last_page)]
+
 def extract_text_from_pdf(pdf_path):
-    """Extracts raw text from a PDF file."""
+    """
+    Extracts raw text from a PDF file.
+    - Large PDFs are split into page ranges that worker processes read in parallel.
+    """
     try:
-        doc = fitz.open(pdf_path)
-        text = "\n".join([page.get_text("text") for page in doc])
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+            if page_count <= config.RESUME_PARALLEL_PAGE_THRESHOLD:
+                return "\n".join([page.get_text("text") for page in doc]).strip()
+
+        # PyMuPDF documents are not thread-safe, so each worker opens its own copy
+        workers = min(os.cpu_count() or 1, page_count)
+        pages_per_worker = -(-page_count // workers)
+        ranges = [(start, min(start + pages_per_worker, page_count)) for start in range(0, page_count, pages_per_worker)]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(_extract_pdf_pages, *zip(*[(pdf_path, first, last) for first, last in ranges]))
+            text = "\n".join(page_text for chunk in chunks for page_text in chunk)
         return text.strip()
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
@@ -23,9 +43,9 @@ def extract_text_from_docx(docx_path):
         print(f"Error extracting text from DOCX: {e}")
         return ""
 
-def extract_resume_text():
+def extract_resume_text(resume_path=None):
     """Detects file format and extracts text accordingly."""
-    resume_path = config.RESUME_FILE
+    resume_path = resume_path or config.RESUME_FILE
     if resume_path.lower().endswith(".pdf"):
         return extract_text_from_pdf(resume_path)
     elif resume_path.lower().endswith(".docx"):
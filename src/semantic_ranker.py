@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+import config
+from utils import job_text
+from nlp_models import get_nlp, model_id
+from metrics import count
+from logger import setup_logger
+
+logger = setup_logger("semantic_ranker")
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def document_vectors(texts, nlp=None):
+    """
+    Unit-length document vectors (texts x vector width, float32) from the model's static word vectors.
+    - A text's vector is the mean vector of its words, skipping stop words, punctuation and words without one.
+    - Only the tokenizer runs; the tagger, parser and NER are not needed for word vectors.
+    """
+    nlp = nlp or get_nlp()
+    vectors = nlp.vocab.vectors
+    if not vectors.shape[1]:
+        raise ValueError(f"NLP model '{config.NLP_MODEL}' has no word vectors; the semantic engine needs one that does (e.g. en_core_web_md)")
+
+    table = np.asarray(vectors.data, dtype=np.float32)
+    result = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+    for row, doc in enumerate(nlp.tokenizer.pipe(texts, batch_size=config.NLP_BATCH_SIZE)):
+        keys = [token.orth for token in doc if not (token.is_stop or token.is_punct or token.is_space)]
+        if keys:
+            vector_rows = np.asarray(vectors.find(keys=keys))
+            vector_rows = vector_rows[vector_rows >= 0]
+            if len(vector_rows):
+                result[row] = table[vector_rows].mean(axis=0)
+
+    norms = np.linalg.norm(result, axis=1, keepdims=True)
+    return np.divide(result, norms, out=np.zeros_like(result), where=norms > 0)
+
+
+class EmbeddingStore:
+    """
+    Document vectors of every job seen, as the rows of a float32 matrix memory-mapped from disk.
+    - The url -> (row, text hash) index lives in SQLite; a job's vector is computed once and only
+      recomputed (in place) when its description changes.
+    - The file grows in blocks of rows; scoring reads just the rows of the jobs being scored, so
+      memory stays flat however many jobs the store holds.
+    - Vectors of another model (name or version) are discarded on the next add_jobs().
+    """
+
+    def __init__(self, path=None, index_path=None):
+        self.path = path or config.EMBEDDING_STORE_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(index_path or config.EMBEDDING_INDEX_FILE, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (url TEXT PRIMARY KEY, row INTEGER NOT NULL, text_hash TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.model = meta.get("model")
+        self.width = int(meta.get("width", 0))
+        self.row_of = {
+            url: (row, text_hash)
+            for url, row, text_hash in self._conn.execute("SELECT url, row, text_hash FROM vectors")
+        }
+        self.next_row = max([row for row, _ in self.row_of.values()] + [-1]) + 1
+        self._matrix = None
+        self._ideal_vectors = {}  # ideal description -> its vector under the current model
+
+        # Rows beyond the end of the file (e.g. it was deleted) cannot be trusted
+        if self.row_of and self._capacity_on_disk() < self.next_row:
+            logger.warning("Embedding store file is missing or truncated; its vectors will be recomputed.")
+            self._reset(self.model, self.width)
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def _capacity_on_disk(self):
+        if not self.width or not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // (self.width * 4)
+
+    def _open(self, rows):
+        """Maps the vector file, growing it (by at least config.EMBEDDING_STORE_BLOCK_ROWS) to hold rows rows."""
+        capacity = self._capacity_on_disk()
+        if rows > capacity:
+            capacity = max(rows, 2 * capacity, config.EMBEDDING_STORE_BLOCK_ROWS)
+            self._matrix = None  # The old mapping must be released before the file is resized
+            open(self.path, "ab").close()
+            os.truncate(self.path, capacity * self.width * 4)
+        if self._matrix is None or len(self._matrix) != capacity:
+            self._matrix = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.width))
+        return self._matrix
+
+    def _reset(self, model, width):
+        """Drops every stored vector (the model changed)."""
+        self._matrix = None
+        self._conn.execute("DELETE FROM vectors")
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [("model", model or ""), ("width", str(width))]
+        )
+        self._conn.commit()
+        if os.path.exists(self.path):
+            os.truncate(self.path, 0)
+        self.model, self.width = model, width
+        self.row_of = {}
+        self.next_row = 0
+        self._ideal_vectors = {}
+
+    def add_jobs(self, jobs):
+        """Computes and stores the vectors of new jobs and of jobs whose description changed. Returns how many."""
+        with self._lock:
+            current_model = model_id()
+            if current_model != self.model:
+                if self.row_of:
+                    logger.info(f"NLP model changed ({self.model} -> {current_model}); recomputing job vectors.")
+                self._reset(current_model, 0)
+
+            missing = {}
+            for job in jobs:
+                text = job_text(job)
+                text_hash = _text_hash(text)
+                known = self.row_of.get(job["url"])
+                if known is None or known[1] != text_hash:
+                    missing[job["url"]] = (text, text_hash)
+            if not missing:
+                return 0
+
+            nlp = get_nlp()
+            vectors = document_vectors([text for text, _ in missing.values()], nlp)
+            if not self.width:
+                self._reset(current_model, vectors.shape[1])
+
+            # A changed description overwrites its job's row; new jobs are appended
+            rows = []
+            for url in missing:
+                if url in self.row_of:
+                    rows.append(self.row_of[url][0])
+                else:
+                    rows.append(self.next_row)
+                    self.next_row += 1
+            matrix = self._open(self.next_row)
+            matrix[rows] = vectors
+            matrix.flush()
+
+            # The index is committed after the vectors are on disk, so it never points at an unwritten row
+            entries = [(url, row, text_hash) for (url, (_, text_hash)), row in zip(missing.items(), rows)]
+            self._conn.executemany("INSERT OR REPLACE INTO vectors (url, row, text_hash) VALUES (?, ?, ?)", entries)
+            self._conn.commit()
+            for url, row, text_hash in entries:
+                self.row_of[url] = (row, text_hash)
+
+        count("semantic_vectors_computed", len(missing))
+        return len(missing)
+
+    def similarities(self, jobs, ideal_texts):
+        """
+        jobs x ideal_texts cosine similarities of stored job vectors (add_jobs() them first):
+        one product of the mapped rows with the ideal vectors.
+        """
+        with self._lock:
+            missing_ideals = [text for text in ideal_texts if text not in self._ideal_vectors]
+            if missing_ideals:
+                self._ideal_vectors.update(zip(missing_ideals, document_vectors(missing_ideals)))
+            ideal_matrix = np.stack([self._ideal_vectors[text] for text in ideal_texts])
+            if not jobs:
+                return np.zeros((0, len(ideal_texts)), dtype=np.float32)
+
+            rows = np.fromiter((self.row_of[job["url"]][0] for job in jobs), dtype=np.int64, count=len(jobs))
+            matrix = np.asarray(self._open(self.next_row)[:self.next_row])
+            # Scoring most of the store: one pass over the mapped rows beats copying the selected ones out
+            if 4 * len(rows) >= self.next_row:
+                return (matrix @ ideal_matrix.T)[rows]
+            return matrix[rows] @ ideal_matrix.T
+
+
+def get_embedding_store():
+    """Returns the process-wide embedding store (kept warm across daemon polls)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore()
+        return _store
+
+def semantic_similarities(jobs, ideal_texts):
+    """jobs x profiles matrix of word-vector similarities; vectors of jobs not seen before are computed first."""
+    store = get_embedding_store()
+    computed = store.add_jobs(jobs)
+    logger.info(f"Embedding store: {computed} job vectors computed, {len(store)} stored.")
+    return store.similarities(jobs, ideal_texts)
@@ -15,6 +15,7 @@ from email.mime.text import MIMEText
 import os
 
 import config
+from api_scheduler import get_scheduler
 
 
 # In[4]:
@@ -90,9 +91,8 @@ def send_gmail(job_title, recruiter_email):
         encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
 
         logging.info("Attempting to send email via Gmail API...")
-        send_message = (
-            service.users().messages().send(userId="me", body={"raw": encoded_message}).execute()
-        )
+        send_request = service.users().messages().send(userId="me", body={"raw": encoded_message})
+        send_message = get_scheduler("gmail").call(send_request.execute)
         logging.info(f"Email sent successfully to {recruiter_email} (Message ID: {send_message['id']})")
 
     except Exception as e:
@@ -0,0 +1,328 @@
+import os
+import json
+import hashlib
+import threading
+from gspread.utils import rowcol_to_a1
+import config
+from api_scheduler import get_scheduler
+from logger import setup_logger
+
+logger = setup_logger("sheets_sync")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _cell_hash(value):
+    """Short hash of a cell value, enough to tell whether the cell changed."""
+    return hashlib.md5(str(value).encode("utf-8")).hexdigest()[:12]
+
+
+class SheetIndex:
+    """
+    Local URL -> (row number, cell hashes) index of every synced worksheet, persisted as JSON.
+    - Lets the writer compute changed cells without reading the sheet back.
+    - A sheet is marked dirty while a sync is in flight; a dirty or missing entry forces reconciliation.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.SHEETS_INDEX_FILE
+        self._lock = threading.Lock()
+        self._sheets = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._sheets = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable sheet index, it will be rebuilt: {e}")
+
+    def _key(self, sheet_name):
+        return f"{config.SPREADSHEET_ID}/{sheet_name}"
+
+    def get(self, sheet_name):
+        """Returns the sheet's index, or None if it must be reconciled first."""
+        with self._lock:
+            state = self._sheets.get(self._key(sheet_name))
+            if state is None or state.get("dirty"):
+                return None
+            return state
+
+    def reconcile(self, sheet_name, url_column_values):
+        """Rebuilds a sheet's index from its URL column (row 1 is the header). Cell hashes are unknown."""
+        rows = {}
+        for row_number, url in enumerate(url_column_values[1:], start=2):
+            if url and url not in rows:
+                rows[url] = [row_number, None]
+        state = {"rows": rows, "next_row": max(len(url_column_values), 1) + 1, "dirty": False}
+        with self._lock:
+            self._sheets[self._key(sheet_name)] = state
+        return state
+
+    def commit(self, sheet_name, new_entries, next_row, replace=False, pinned=None):
+        """
+        Records the rows written by a successful sync and clears the dirty flag.
+        - replace=True makes new_entries the sheet's whole index (rows not in it were cleared).
+        - pinned lists the URLs of rows kept below the ranks for their hand-edited cells.
+        """
+        with self._lock:
+            state = self._sheets[self._key(sheet_name)]
+            if replace:
+                state["rows"] = dict(new_entries)
+            if pinned is not None:
+                state["pinned"] = list(pinned)
+            else:
+                state["rows"].update(new_entries)
+            state["next_row"] = next_row
+            state["dirty"] = False
+            self._save()
+
+    def set_dirty(self, sheet_name, dirty):
+        with self._lock:
+            state = self._sheets.get(self._key(sheet_name))
+            if state is not None:
+                state["dirty"] = dirty
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._sheets, f)
+        os.replace(tmp_path, self.path)
+
+
+def get_sheet_index():
+    """Returns the process-wide sheet index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SheetIndex()
+        return _index
+
+def _column_runs(columns):
+    """Splits sorted 1-based column numbers into contiguous (first, last) runs."""
+    runs = []
+    for col in columns:
+        if runs and runs[-1][1] == col - 1:
+            runs[-1][1] = col
+        else:
+            runs.append([col, col])
+    return runs
+
+def _merge_ranges(updates):
+    """
+    Merges single-row updates (row, first_col, values) that cover the same columns on
+    consecutive rows into one block, returning (first_row, first_col, values_2d) blocks.
+    """
+    blocks = []
+    for row, first_col, values in sorted(updates, key=lambda u: (u[1], len(u[2]), u[0])):
+        last = blocks[-1] if blocks else None
+        if last and last[1] == first_col and len(last[2][0]) == len(values) and last[0] + len(last[2]) == row:
+            last[2].append(values)
+        else:
+            blocks.append((row, first_col, [values]))
+    return blocks
+
+def sync_rows(spreadsheet, worksheet, url_column, rows_by_url, insert_only_columns=(), touch_columns=()):
+    """
+    Brings a worksheet in line with rows_by_url ({url: row values}) in one values_batch_update request.
+    - Requests go through the Sheets quota schedulers; writes queued at the same time share one request.
+    - Existing rows only get their changed cells written; new rows go after the last known row.
+    - insert_only_columns (1-based) are written for new rows only (e.g. "Date Added", user-edited columns).
+    - touch_columns (e.g. "Last Updated") are written only when another cell of the row changed.
+    - Only the URL column is read, and only when the local index is missing or dirty.
+    Returns (updated_rows, added_rows).
+    """
+    index = get_sheet_index()
+    sheet_name = worksheet.title
+    state = _load_state(index, worksheet, url_column)
+
+    updates, new_entries = [], {}
+    next_row = state["next_row"]
+    updated_rows = added_rows = 0
+
+    for url, values in rows_by_url.items():
+        hashes = [_cell_hash(value) for value in values]
+        entry = state["rows"].get(url)
+
+        if entry is None:
+            updates.append((next_row, 1, list(values)))
+            new_entries[url] = [next_row, hashes]
+            next_row += 1
+            added_rows += 1
+            continue
+
+        row_number, old_hashes = entry
+        changed = [
+            col for col in range(1, len(values) + 1)
+            if col not in insert_only_columns and col not in touch_columns
+            and (old_hashes is None or col > len(old_hashes) or old_hashes[col - 1] != hashes[col - 1])
+        ]
+        if not changed:
+            continue
+
+        changed = sorted(changed + [col for col in touch_columns if col <= len(values)])
+        for first_col, last_col in _column_runs(changed):
+            updates.append((row_number, first_col, list(values[first_col - 1:last_col])))
+
+        # Insert-only cells keep whatever the sheet holds; remember only the columns we wrote
+        merged_hashes = list(old_hashes) if old_hashes else [None] * len(values)
+        merged_hashes += [None] * (len(values) - len(merged_hashes))
+        for col in changed:
+            merged_hashes[col - 1] = hashes[col - 1]
+        new_entries[url] = [row_number, merged_hashes]
+        updated_rows += 1
+
+    if not updates:
+        return 0, 0
+
+    ranges = _write_updates(spreadsheet, worksheet, index, updates, next_row - 1)
+    index.commit(sheet_name, new_entries, next_row)
+
+    logger.info(f"Synced '{sheet_name}': {updated_rows} rows updated, {added_rows} rows added in {ranges} ranges.")
+    return updated_rows, added_rows
+
+def sync_ranked_rows(spreadsheet, worksheet, url_column, ranked_rows, width, user_columns=(), touch_columns=()):
+    """
+    Makes rows 2.. of a worksheet hold ranked_rows ([(url, row values)], best first), in one request.
+    - A job still on the same row only gets its changed cells written; a job that moved rank or is new gets
+      its whole row written at its new position.
+    - user_columns (1-based, edited by hand) travel with their job when it moves and are blank for new jobs.
+    - touch_columns (e.g. "Last Updated") are written only when another cell of the row changed.
+    - Rows that left the ranks (dropped out or expired) are cleared across `width` columns, unless they hold
+      hand-edited cells: those rows are kept, pinned below the last rank in their old order.
+    - The sheet is read back (one range) only when some job moved or a row not pinned yet left the ranks.
+    Returns (written_rows, cleared_rows).
+    """
+    index = get_sheet_index()
+    sheet_name = worksheet.title
+    state = _load_state(index, worksheet, url_column)
+    old_rows = state["rows"]
+    old_last_row = max([entry[0] for entry in old_rows.values()] + [state["next_row"] - 1])
+
+    ranked_urls = {url for url, _ in ranked_rows}
+    moved = {url for rank, (url, _) in enumerate(ranked_rows, start=2) if url in old_rows and old_rows[url][0] != rank}
+    dropped = [url for url, entry in sorted(old_rows.items(), key=lambda item: item[1][0]) if url not in ranked_urls]
+    # Rows pinned by the last sync that still sit right below the ranks need no read
+    pinned_before = set(state.get("pinned", ()))
+    settled = all(
+        url in pinned_before and old_rows[url][0] == len(ranked_rows) + 2 + offset for offset, url in enumerate(dropped)
+    )
+
+    carried, pinned_rows = {}, []
+    if user_columns and (moved or not settled):
+        grid = get_scheduler("sheets_read").call(worksheet.get, f"A2:{rowcol_to_a1(old_last_row, width)}")
+        url_by_row = {entry[0]: url for url, entry in old_rows.items()}
+        dropped_urls = set(dropped)
+        for offset, values in enumerate(grid):
+            url = url_by_row.get(offset + 2)
+            values = list(values) + [""] * (width - len(values))
+            edited = {col: values[col - 1] for col in user_columns}
+            if url in moved:
+                carried[url] = edited
+            elif url in dropped_urls and any(str(value).strip() for value in edited.values()):
+                carried[url] = edited
+                pinned_rows.append((url, values))
+    elif user_columns:
+        pinned_rows = [(url, None) for url in dropped]
+
+    updates, new_entries = [], {}
+    written_rows = 0
+    for row_number, (url, values) in enumerate(ranked_rows + pinned_rows, start=2):
+        entry = old_rows.get(url)
+        if values is None:
+            # Pinned and already in place
+            new_entries[url] = entry
+            continue
+        values = list(values)
+        hashes = [_cell_hash(value) for value in values]
+
+        if entry is not None and entry[0] == row_number:
+            old_hashes = entry[1]
+            changed = [
+                col for col in range(1, len(values) + 1)
+                if col not in user_columns and col not in touch_columns
+                and (old_hashes is None or col > len(old_hashes) or old_hashes[col - 1] != hashes[col - 1])
+            ]
+            if not changed:
+                new_entries[url] = entry
+                continue
+            changed = sorted(changed + [col for col in touch_columns if col <= len(values)])
+            for first_col, last_col in _column_runs(changed):
+                updates.append((row_number, first_col, values[first_col - 1:last_col]))
+            merged_hashes = list(old_hashes) if old_hashes else [None] * len(values)
+            merged_hashes += [None] * (len(values) - len(merged_hashes))
+            for col in changed:
+                merged_hashes[col - 1] = hashes[col - 1]
+            new_entries[url] = [row_number, merged_hashes]
+        else:
+            # Moved or new: the whole row is written, carrying the job's hand-edited cells along
+            for col in user_columns:
+                values[col - 1] = carried.get(url, {}).get(col, "")
+                hashes[col - 1] = None
+            updates.append((row_number, 1, values))
+            new_entries[url] = [row_number, hashes]
+        written_rows += 1
+
+    next_row = len(ranked_rows) + len(pinned_rows) + 2
+    cleared_rows = max(0, old_last_row - next_row + 1)
+    for row_number in range(next_row, old_last_row + 1):
+        updates.append((row_number, 1, [""] * width))
+
+    pinned = [url for url, _ in pinned_rows]
+    if not updates:
+        if pinned != state.get("pinned", []):
+            index.commit(sheet_name, new_entries, next_row, replace=True, pinned=pinned)
+        return 0, 0
+
+    ranges = _write_updates(spreadsheet, worksheet, index, updates, next_row - 1)
+    index.commit(sheet_name, new_entries, next_row, replace=True, pinned=pinned)
+
+    logger.info(
+        f"Synced '{sheet_name}': {written_rows} ranked rows written, {len(pinned)} hand-edited rows pinned, "
+        f"{cleared_rows} rows cleared in {ranges} ranges."
+    )
+    return written_rows, cleared_rows
+
+def read_rows(worksheet, url_column, width):
+    """Every data row of a worksheet as [(url, row values)] in sheet order (one range read; rows without a URL are skipped)."""
+    state = _load_state(get_sheet_index(), worksheet, url_column)
+    last_row = max([entry[0] for entry in state["rows"].values()] + [state["next_row"] - 1])
+    if last_row < 2:
+        return []
+    grid = get_scheduler("sheets_read").call(worksheet.get, f"A2:{rowcol_to_a1(last_row, width)}")
+    rows = []
+    for values in grid:
+        values = list(values) + [""] * (width - len(values))
+        if values[url_column - 1]:
+            rows.append((values[url_column - 1], values))
+    return rows
+
+def _load_state(index, worksheet, url_column):
+    """Returns the worksheet's index, reconciling it from the URL column when it is missing or dirty."""
+    state = index.get(worksheet.title)
+    if state is None:
+        logger.info(f"Reconciling '{worksheet.title}' from its URL column...")
+        url_column_values = get_scheduler("sheets_read").call(worksheet.col_values, url_column)
+        state = index.reconcile(worksheet.title, url_column_values)
+    return state
+
+def _write_updates(spreadsheet, worksheet, index, updates, last_row):
+    """
+    Sends the row updates as one values_batch_update (merged into as few ranges as possible).
+    The sheet stays marked dirty if the request fails. Returns the number of ranges written.
+    """
+    # Make sure the grid has room for the appended rows
+    if last_row > worksheet.row_count:
+        get_scheduler("sheets_write").call(worksheet.add_rows, last_row - worksheet.row_count)
+
+    data = [
+        {
+            "range": f"'{worksheet.title}'!{rowcol_to_a1(row, col)}:{rowcol_to_a1(row + len(values) - 1, col + len(values[0]) - 1)}",
+            "values": values
+        }
+        for row, col, values in _merge_ranges(updates)
+    ]
+
+    index.set_dirty(worksheet.title, True)
+    get_scheduler("sheets_write").values_batch_update(spreadsheet, data)
+    return len(data)
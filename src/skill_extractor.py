@@ -1,16 +1,17 @@
-import spacy
-import re
+import os
+import json
+import hashlib
 from resume_parser import extract_resume_text
+from skill_matcher import get_skill_matcher
+from nlp_models import get_nlp, model_id
+from metrics import span
 import config
 
-# Load SpaCy NLP model
-nlp = spacy.load("en_core_web_sm")
-
 
 def extract_skills_from_text(resume_text):
     """Extracts skills from resume text using NLP and keyword matching."""
     extracted_skills = set()
-    doc = nlp(resume_text)
+    doc = get_nlp()(resume_text)  # Shared with job_filter through the model registry
 
     # Extracting noun phrases (potential skills)
     for chunk in doc.noun_chunks:
@@ -18,21 +19,83 @@ def extract_skills_from_text(resume_text):
         if skill in config.TECHNICAL_SKILLS:
             extracted_skills.add(skill)
 
-    # Matching predefined skills in resume text (case-insensitive)
-    for skill in config.TECHNICAL_SKILLS:
-        if re.search(rf"\b{re.escape(skill)}\b", resume_text, re.IGNORECASE):
-            extracted_skills.add(skill)
+    # Matching predefined skills in resume text (case-insensitive, one pass over the text)
+    extracted_skills.update(get_skill_matcher().find(resume_text))
 
     return sorted(list(extracted_skills))
 
-def get_resume_skills():
-    """Wrapper function to extract skills from the resume file."""
-    resume_text = extract_resume_text()
-    if not resume_text:
-        return []
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_resume_cache():
+    if not os.path.exists(config.RESUME_CACHE_FILE):
+        return {}
+    try:
+        with open(config.RESUME_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}  # A broken cache only costs one re-parse
+
+def _save_resume_cache(cache):
+    tmp_path = f"{config.RESUME_CACHE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, config.RESUME_CACHE_FILE)
+
+def get_resume_skills(resume_path=None):
+    """
+    Wrapper function to extract skills from the resume file.
+    - Parsed text and skills are cached under DATA_DIR, keyed on the file's size, mtime and
+      SHA-256 plus the skill list / model version; they are recomputed only when one changes.
+    """
+    resume_path = resume_path or config.RESUME_FILE
+    with span("resume_skills") as stage:
+        skills_version = f"{get_skill_matcher().version}+{model_id()}"
+
+        try:
+            stat = os.stat(resume_path)
+        except OSError:
+            stat = None  # Let the parser report the missing file as before
+
+        cache = _load_resume_cache()
+        entry = cache.get(resume_path)
+        file_hash = None
+
+        if stat is not None and entry and entry["skills_version"] == skills_version:
+            # Same size and mtime: trust the cached result without reading the file
+            if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                stage.count("resume_cache_hits")
+                return entry["skills"]
+
+            # Touched but identical content: refresh the stat fields only
+            file_hash = _file_sha256(resume_path)
+            if entry["sha256"] == file_hash:
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+                _save_resume_cache(cache)
+                stage.count("resume_cache_hits")
+                return entry["skills"]
+
+        resume_text = extract_resume_text(resume_path)
+        if not resume_text:
+            return []
+
+        skills = extract_skills_from_text(resume_text)
 
-    skills = extract_skills_from_text(resume_text)
-    return skills
+        if stat is not None:
+            cache[resume_path] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": file_hash or _file_sha256(resume_path),
+                "skills_version": skills_version,
+                "text": resume_text,
+                "skills": skills
+            }
+            _save_resume_cache(cache)
+        return skills
 
 if __name__ == "__main__":
     extracted_skills = get_resume_skills()
@@ -0,0 +1,64 @@
+import re
+import hashlib
+import threading
+import config
+
+# Lowercase word tokens; keeps "c++", "c#", "node.js" in one piece
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+_END = object()
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Splits text into the lowercase tokens skills are matched on."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class SkillMatcher:
+    """
+    Token trie built once from a skill list.
+    - find() walks the document tokens once and reports every single- and multi-word skill, case-insensitively.
+    - Work per token is bounded by the longest skill (in tokens), not by the number of skills.
+    """
+
+    def __init__(self, skills):
+        self._trie = {}
+        self.max_tokens = 0
+        for skill in skills:
+            tokens = tokenize(skill)
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(_END, skill)  # First spelling in the list is the canonical one
+            self.max_tokens = max(self.max_tokens, len(tokens))
+
+        # Changes whenever the taxonomy changes (used in cache keys)
+        self.version = hashlib.sha1("\n".join(sorted(skills)).encode("utf-8")).hexdigest()[:12]
+
+    def find(self, text):
+        """Returns the sorted list of canonical skills that occur in text."""
+        tokens = tokenize(text)
+        total_tokens = len(tokens)
+        found = set()
+        for start in range(total_tokens):
+            node = self._trie
+            for idx in range(start, min(start + self.max_tokens, total_tokens)):
+                node = node.get(tokens[idx])
+                if node is None:
+                    break
+                if _END in node:
+                    found.add(node[_END])
+        return sorted(found)
+
+
+def get_skill_matcher(skills=None):
+    """Returns the shared matcher of a skill list (config.TECHNICAL_SKILLS by default)."""
+    skills = tuple(config.TECHNICAL_SKILLS if skills is None else skills)
+    with _matchers_lock:
+        if skills not in _matchers:
+            _matchers[skills] = SkillMatcher(skills)
+        return _matchers[skills]
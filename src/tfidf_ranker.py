@@ -0,0 +1,397 @@
+import os
+import uuid
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+import config
+from utils import job_text
+from job_store import get_job_store
+from job_scraper import iter_cached_jobs
+from logger import setup_logger
+
+logger = setup_logger("tfidf_ranker")
+
+_resident = {}  # path -> (file mtime, model) of the last model saved by this process
+_counts = None
+_counts_lock = threading.Lock()
+
+
+# Bump when the text fed to the model or the stored format changes so stored models are refit
+MODEL_VERSION = 3
+
+
+def _text_hash(text):
+    """Short content hash used to detect changed descriptions."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class TermCountStore:
+    """
+    Per-job term counts of the TF-IDF model in SQLite (url -> text hash, column indices, counts),
+    read back one batch of jobs at a time.
+    - Writes stay in an open transaction until commit(); rollback() drops those of a run that failed
+      before the model was saved.
+    - commit() stamps the counts with the stamp of the pickled model they belong to.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.TFIDF_COUNTS_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counts (url TEXT PRIMARY KEY, text_hash TEXT NOT NULL, cols BLOB NOT NULL, "
+            "counts BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def stamp(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+        return row[0] if row else None
+
+    def _select(self, columns, urls):
+        rows = []
+        with self._lock:
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(self._conn.execute(
+                    f"SELECT url, {columns} FROM counts WHERE url IN ({placeholders})", chunk
+                ).fetchall())
+        return rows
+
+    def text_hashes(self, urls):
+        """Returns {url: text hash} of the given jobs that have stored counts."""
+        return dict(self._select("text_hash", list(urls)))
+
+    def load(self, urls, width):
+        """Term counts of the given jobs (all must be stored), one CSR row per URL in the same order."""
+        urls = list(urls)
+        found = {url: (cols, counts) for url, cols, counts in self._select("cols, counts", urls)}
+        indptr, indices, values = [0], [], []
+        for url in urls:
+            cols, counts = found[url]
+            indices.append(np.frombuffer(cols, dtype=np.int32))
+            values.append(np.frombuffer(counts, dtype=np.float32))
+            indptr.append(indptr[-1] + len(indices[-1]))
+        return sparse.csr_matrix(
+            (
+                np.concatenate(values) if values else np.empty(0, dtype=np.float32),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                np.asarray(indptr, dtype=np.int64)
+            ),
+            shape=(len(urls), width)
+        )
+
+    def put(self, urls, text_hashes, counts):
+        """Stores the CSR rows of counts for urls (same order), replacing older counts of the same jobs."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO counts (url, text_hash, cols, counts) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        url, text_hash,
+                        counts.indices[counts.indptr[row]:counts.indptr[row + 1]].astype(np.int32).tobytes(),
+                        counts.data[counts.indptr[row]:counts.indptr[row + 1]].astype(np.float32).tobytes()
+                    )
+                    for row, (url, text_hash) in enumerate(zip(urls, text_hashes))
+                ]
+            )
+
+    def delete(self, urls):
+        with self._lock:
+            self._conn.executemany("DELETE FROM counts WHERE url = ?", [(url,) for url in urls])
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM counts")
+
+    def iter_urls(self, chunk_size):
+        """Yields the URLs of every stored job in lists of at most chunk_size."""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, url FROM counts WHERE rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [url for _, url in rows]
+
+    def commit(self, stamp):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stamp', ?)", (stamp,))
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+
+
+def get_term_count_store():
+    """Returns the process-wide term count store."""
+    global _counts
+    with _counts_lock:
+        if _counts is None:
+            _counts = TermCountStore()
+        return _counts
+
+
+class TfidfModel:
+    """
+    Persisted TF-IDF state: vocabulary, document frequencies and doc count (pickled), plus the per-job
+    term counts in the TermCountStore.
+    - New jobs are counted once and folded into the IDF statistics incrementally.
+    - Stored count rows of known jobs are read back per batch; only the IDF weighting is reapplied.
+    - Expired jobs are folded back out and their count rows deleted.
+    - Memory holds the vocabulary and IDF statistics plus the rows of the batch at hand, never the whole pool.
+    """
+
+    def __init__(self, vocabulary, doc_freq, n_docs, ideal_hash):
+        self.vocabulary = vocabulary
+        self.doc_freq = doc_freq
+        self.n_docs = n_docs
+        self.ideal_hash = ideal_hash
+        self.version = MODEL_VERSION
+        self.stamp = None  # Matches the term count store's stamp once saved
+
+        # Out-of-vocabulary statistics for jobs folded in since the last fit
+        self.folded_tokens = 0
+        self.folded_oov_tokens = 0
+
+    @classmethod
+    def fit_chunks(cls, job_chunks, ideal_text):
+        """
+        Full refit that streams the jobs twice instead of holding them all in memory.
+        - job_chunks() must return a fresh iterable of job lists on every call.
+        - Pass 1 counts term frequencies to pick the vocabulary (same rule as CountVectorizer's
+          max_features), pass 2 counts each job against it.
+        """
+        analyzer = CountVectorizer(stop_words="english").build_analyzer()
+        term_totals = Counter(analyzer(ideal_text))
+        for chunk in job_chunks():
+            for job in chunk:
+                term_totals.update(analyzer(job_text(job)))
+
+        top_terms = [term for term, _ in term_totals.most_common(config.TFIDF_MAX_FEATURES)]
+        vocabulary = {term: idx for idx, term in enumerate(sorted(top_terms))}
+        model = cls(vocabulary, np.zeros(len(vocabulary), dtype=np.int64), 0, _text_hash(ideal_text))
+        get_term_count_store().clear()
+
+        ideal_counts, _, _ = model._count_rows([ideal_text])
+        model.doc_freq += np.bincount(ideal_counts.indices, minlength=len(vocabulary))
+        model.n_docs = 1
+        for chunk in job_chunks():
+            model.update(chunk)
+
+        # A fresh fit starts with no drift
+        model.folded_tokens = model.folded_oov_tokens = 0
+        return model
+
+    def drift(self):
+        """Share of tokens folded in since the last fit that fall outside the vocabulary."""
+        if not self.folded_tokens:
+            return 0.0
+        return self.folded_oov_tokens / self.folded_tokens
+
+    def needs_refit(self, ideal_text):
+        """
+        True when the model format or ideal description changed, the stored term counts are not the ones saved
+        with this model (a run stopped between the two writes), or vocabulary drift crossed the threshold.
+        """
+        return (
+            self.version != MODEL_VERSION
+            or self.stamp != get_term_count_store().stamp()
+            or self.ideal_hash != _text_hash(ideal_text)
+            or self.drift() > config.TFIDF_REFIT_DRIFT_THRESHOLD
+        )
+
+    def _count_rows(self, texts):
+        """Counts in-vocabulary terms for each text and tracks out-of-vocabulary tokens."""
+        analyzer = CountVectorizer(stop_words="english").build_analyzer()
+        indptr, indices, values = [0], [], []
+        total_tokens = oov_tokens = 0
+
+        for text in texts:
+            row = {}
+            tokens = analyzer(text)
+            total_tokens += len(tokens)
+            for token in tokens:
+                col = self.vocabulary.get(token)
+                if col is None:
+                    oov_tokens += 1
+                else:
+                    row[col] = row.get(col, 0) + 1
+            indices.extend(row.keys())
+            values.extend(row.values())
+            indptr.append(len(indices))
+
+        counts = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), len(self.vocabulary))
+        )
+        counts.sort_indices()
+        return counts, total_tokens, oov_tokens
+
+    def update(self, jobs):
+        """Counts new or changed jobs and folds them into the document frequencies. Returns how many were folded."""
+        store = get_term_count_store()
+        jobs_by_url = {job["url"]: job for job in jobs}
+        hashes = {url: _text_hash(job_text(job)) for url, job in jobs_by_url.items()}
+        known = store.text_hashes(hashes)
+        pending = [url for url, text_hash in hashes.items() if known.get(url) != text_hash]
+        if not pending:
+            return 0
+
+        counts, total_tokens, oov_tokens = self._count_rows([job_text(jobs_by_url[url]) for url in pending])
+
+        # Changed descriptions replace their old contribution to the document frequencies
+        changed = [url for url in pending if url in known]
+        if changed:
+            self.doc_freq -= np.bincount(store.load(changed, len(self.vocabulary)).indices, minlength=len(self.vocabulary))
+            self.n_docs -= len(changed)
+
+        self.doc_freq += np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.n_docs += len(pending)
+        self.folded_tokens += total_tokens
+        self.folded_oov_tokens += oov_tokens
+        store.put(pending, [hashes[url] for url in pending], counts)
+        return len(pending)
+
+    def expire(self, urls):
+        """Folds the given jobs (postings no feed lists anymore) out of the document frequencies. Returns how many."""
+        store = get_term_count_store()
+        urls = list(urls)
+        for start in range(0, len(urls), config.PIPELINE_CHUNK_SIZE):
+            chunk = urls[start:start + config.PIPELINE_CHUNK_SIZE]
+            self.doc_freq -= np.bincount(store.load(chunk, len(self.vocabulary)).indices, minlength=len(self.vocabulary))
+            self.n_docs -= len(chunk)
+            store.delete(chunk)
+        return len(urls)
+
+    def idf(self):
+        """Smoothed IDF, same formula as sklearn's TfidfVectorizer."""
+        return (np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1).astype(np.float32)
+
+    def _weight(self, counts):
+        """Applies IDF weighting and L2 row normalization to term counts."""
+        weighted = counts.multiply(self.idf()).tocsr().astype(np.float32)
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms).dot(weighted).astype(np.float32).tocsr()
+
+    def transform(self, jobs):
+        """Returns the TF-IDF matrix for jobs already known to the model, reusing their stored rows."""
+        return self._weight(get_term_count_store().load([job["url"] for job in jobs], len(self.vocabulary)))
+
+    def transform_text(self, text):
+        """Returns the TF-IDF vector of a free text (e.g. the ideal job description)."""
+        return self.transform_texts([text])
+
+    def transform_texts(self, texts):
+        """Returns one TF-IDF row per free text (e.g. the ideal descriptions of several profiles)."""
+        counts, _, _ = self._count_rows(texts)
+        return self._weight(counts)
+
+    def save(self, path=None):
+        """Persists the model under config.DATA_DIR, committing the term counts written since the last save."""
+        path = path or config.TFIDF_MODEL_FILE
+        self.stamp = uuid.uuid4().hex
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f)
+        # Stopping between the commit and the replace leaves counts and model with different stamps: needs_refit()
+        get_term_count_store().commit(self.stamp)
+        os.replace(tmp_path, path)
+        _resident[path] = (os.stat(path).st_mtime_ns, self)
+
+
+def load_tfidf_model(path=None):
+    """
+    Loads the persisted TF-IDF model, or returns None if there is none (or it is unreadable).
+    - A long-running process (daemon mode) gets back the model it saved last, without unpickling,
+      as long as the file has not changed since. The caller owns it until its next save().
+    """
+    path = path or config.TFIDF_MODEL_FILE
+    # Term counts written by a run that failed before save() are dropped with it
+    get_term_count_store().rollback()
+    if not os.path.exists(path):
+        return None
+    # Handed out once: a run that fails before save() must not leave a half-updated model behind
+    mtime, model = _resident.pop(path, (None, None))
+    if model is not None and mtime == os.stat(path).st_mtime_ns:
+        return model
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.error(f"Error loading TF-IDF model, it will be refit: {e}")
+        return None
+
+def vectorize_jobs(jobs, refit=False, ideal_texts=None):
+    """
+    Returns (job_tfidf_vectors, ideal_job_vector) for the given jobs using the persisted model.
+    - Refits from scratch over the stored job pool when requested, when there is no stored model, or when
+      drift is too high.
+    - Otherwise only new or changed jobs are counted and folded into the IDF statistics.
+    - ideal_texts (e.g. one per profile) replaces the ideal vector by one row per text.
+    """
+    model = None if refit else load_tfidf_model()
+
+    if model is None or model.needs_refit(config.IDEAL_JOB_DESC):
+        model = _refit_on_pool()
+        model.update(jobs)
+    else:
+        expired = _expire_unlisted(model)
+        folded = model.update(jobs)
+        logger.info(f"TF-IDF model reused: {folded} new jobs folded in, {expired} expired, drift {model.drift():.1%}")
+
+    model.save()
+    ideal_vectors = model.transform_texts(ideal_texts if ideal_texts is not None else [config.IDEAL_JOB_DESC])
+    return model.transform(jobs), ideal_vectors
+
+def _refit_on_pool():
+    """
+    Full refit over the whole job pool of the latest fetch, streamed from the job store, never just the
+    batch being scored: a refit on a handful of new jobs would shrink the vocabulary and swing the IDF.
+    """
+    logger.info("Refitting TF-IDF model on the stored job pool...")
+    return TfidfModel.fit_chunks(lambda: iter_cached_jobs(config.PIPELINE_CHUNK_SIZE), config.IDEAL_JOB_DESC)
+
+def _expire_unlisted(model):
+    """Folds expired jobs out of a reused model (as in bm25_ranker, an empty listing expires nothing)."""
+    store = get_job_store()
+    expired, any_listed = [], False
+    for urls in get_term_count_store().iter_urls(config.PIPELINE_CHUNK_SIZE):
+        listed = store.listed_urls(urls)
+        any_listed = any_listed or bool(listed)
+        expired.extend(url for url in urls if url not in listed)
+    return model.expire(expired) if any_listed else 0
+
+def prepare_tfidf_model(job_chunks, refit=False):
+    """
+    Streaming counterpart of vectorize_jobs for chunked runs; returns the model to transform chunks with.
+    - job_chunks() returns a fresh iterable of job lists; new or changed jobs are folded in chunk by chunk.
+    - The IDF is final once this returns, so every chunk is weighted exactly as in a single batch.
+    """
+    model = None if refit else load_tfidf_model()
+
+    if model is None or model.needs_refit(config.IDEAL_JOB_DESC):
+        model = _refit_on_pool()
+        for chunk in job_chunks():
+            model.update(chunk)
+    else:
+        expired = _expire_unlisted(model)
+        folded = sum(model.update(chunk) for chunk in job_chunks())
+        logger.info(f"TF-IDF model reused: {folded} new jobs folded in, {expired} expired, drift {model.drift():.1%}")
+
+    model.save()
+    return model
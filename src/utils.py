@@ -1,11 +1,98 @@
-from bs4 import BeautifulSoup
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+import config
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:  # lxml is optional; the stdlib tokenizer is used without it
+    lxml = None
+
+_SKIPPED_TAGS = {"script", "style"}
+
+_normalized_cache = OrderedDict()
+_normalized_cache_lock = threading.Lock()
+
+
+class _TextExtractor(HTMLParser):
+    """Streaming tokenizer that keeps text nodes only (no tree is built)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _extract_text(content):
+    """Returns the text nodes of an HTML fragment joined by spaces, using the stdlib tokenizer."""
+    extractor = _TextExtractor()
+    extractor.feed(content)
+    extractor.close()
+    return " ".join(extractor.parts)
+
+def _strip_html(content):
+    """Returns the text nodes of an HTML fragment joined by spaces."""
+    if lxml is not None:
+        root = lxml.html.fragment_fromstring(content, create_parent="div")
+        lxml.etree.strip_elements(root, *_SKIPPED_TAGS, with_tail=False)
+        return " ".join(root.itertext())
+    return _extract_text(content)
+
+def normalize_html(content):
+    """
+    Strips HTML tags and collapses whitespace into plain text.
+    - Uses lxml when installed, otherwise (or when lxml fails on the content) a streaming stdlib tokenizer.
+    - Results are memoized by content hash, so repeated descriptions are only parsed once.
+    """
+    if not content:
+        return ""
+
+    key = hashlib.sha1(content.encode("utf-8")).digest()
+    with _normalized_cache_lock:
+        if key in _normalized_cache:
+            _normalized_cache.move_to_end(key)
+            return _normalized_cache[key]
 
-def clean_html(content):
-    """Removes HTML tags and extracts plain text."""
     try:
-        soup = BeautifulSoup(content, "html.parser")
-        return soup.get_text(separator=" ").strip()
+        text = " ".join(_strip_html(content).split())
     except Exception as e:
-        logging.error(f"Error cleaning HTML content: {e}")
-        return content  # Return raw content if cleaning fails
+        logging.error(f"Error cleaning HTML content, falling back to the stdlib tokenizer: {e}")
+        text = " ".join(_extract_text(content).split())
+
+    with _normalized_cache_lock:
+        _normalized_cache[key] = text
+        if len(_normalized_cache) > config.NORMALIZE_CACHE_SIZE:
+            _normalized_cache.popitem(last=False)
+    return text
+
+def clean_html(content):
+    """Removes HTML tags and extracts plain text."""
+    return normalize_html(content)
+
+def attach_clean_description(job):
+    """
+    Normalizes a job's HTML description once and stores it as job["clean_description"].
+    (Derived on read: the job store drops it before storing, see JobStore.upsert_jobs.)
+    """
+    if "clean_description" not in job:
+        job["clean_description"] = normalize_html(job.get("description", ""))
+    return job
+
+def job_text(job):
+    """Clean description text of a job, the input of TF-IDF, NLP and the Sheets writer."""
+    return attach_clean_description(job)["clean_description"]
@@ -0,0 +1,16 @@
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the tracker at throwaway data/logs directories before config is imported
+_work_dir = tempfile.mkdtemp(prefix="job_tracker_tests_")
+atexit.register(shutil.rmtree, _work_dir, ignore_errors=True)
+os.environ.setdefault("JOB_TRACKER_DATA_DIR", os.path.join(_work_dir, "data"))
+os.environ.setdefault("JOB_TRACKER_LOGS_DIR", os.path.join(_work_dir, "logs"))
+os.environ.setdefault("SPREADSHEET_ID", "tests")
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, REPO_ROOT)
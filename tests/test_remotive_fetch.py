@@ -0,0 +1,90 @@
+import itertools
+import pytest
+import config
+import job_store
+import job_scraper
+from job_scraper import get_new_jobs, remotive_feed_url
+from benchmarks.corpus import generate_jobs, churn
+from benchmarks.stub_remotive import StubRemotive
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A fresh job store per test; each fetch gets its own seen_at, as runs a minute apart would."""
+    store = job_store.JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_store, "_store", store)
+    ticks = itertools.count(1)
+    monkeypatch.setattr(job_scraper, "utc_timestamp", lambda: f"2025-01-01 00:00:{next(ticks):02d}")
+    return store
+
+@pytest.fixture
+def stub(monkeypatch):
+    with StubRemotive(generate_jobs(30)) as stub:
+        monkeypatch.setattr(config, "REMOTIVE_URL", stub.url)
+        monkeypatch.setattr(config, "REMOTIVE_QUERIES", [{}])
+        yield stub
+
+def _listed(store, jobs):
+    return store.listed_urls(job["url"] for job in jobs)
+
+
+def test_fetch_stores_the_whole_feed(store, stub):
+    jobs = generate_jobs(30)
+    new_jobs = get_new_jobs()
+
+    assert [job["url"] for job in new_jobs] == [job["url"] for job in jobs]
+    assert _listed(store, jobs) == {job["url"] for job in jobs}
+    assert store.get_fetch_validators(remotive_feed_url()).get("etag")
+
+    # Clean descriptions are derived on read, never stored
+    assert all("clean_description" in job for job in new_jobs)
+    assert all("clean_description" not in job for job in store.latest_jobs())
+
+def test_unchanged_feed_is_not_downloaded_again(store, stub):
+    jobs = generate_jobs(30)
+    get_new_jobs()
+    bytes_sent = stub.stats()["bytes_sent"]
+
+    # The stored ETag turns the next request into a 304: nothing to process, every listing kept
+    assert get_new_jobs() is None
+    assert stub.stats()["requests"] == 2
+    assert stub.stats()["bytes_sent"] == bytes_sent
+    assert _listed(store, jobs) == {job["url"] for job in jobs}
+
+def test_changed_feed_drops_expired_listings(store, stub):
+    jobs = generate_jobs(30)
+    get_new_jobs()
+    next_jobs = churn(jobs, 0.2)
+    stub.set_jobs(next_jobs)
+
+    new_jobs = get_new_jobs()
+
+    assert [job["url"] for job in new_jobs] == [job["url"] for job in next_jobs[-6:]]
+    assert _listed(store, jobs + next_jobs) == {job["url"] for job in next_jobs}
+
+def test_failed_fetch_keeps_listings(store, stub):
+    jobs = generate_jobs(30)
+    get_new_jobs()
+    etag = store.get_fetch_validators(remotive_feed_url()).get("etag")
+    stub.set_jobs(churn(jobs, 0.2))
+    stub.set_status(503)
+
+    # A 503 is a failed feed, not an empty one: no listing expires and the validators stay put
+    assert get_new_jobs() is None
+    assert _listed(store, jobs) == {job["url"] for job in jobs}
+    assert store.get_fetch_validators(remotive_feed_url()).get("etag") == etag
+
+    # Once the feed answers again, the changes come through
+    stub.set_status(None)
+    assert len(get_new_jobs()) == 6
+
+def test_uncollected_new_jobs_are_read_back_in_chunks(store, stub):
+    jobs = generate_jobs(30)
+    new_jobs = get_new_jobs(collect=False)
+    assert len(new_jobs) == 30
+    assert [len(chunk) for chunk in new_jobs.chunks(12)] == [12, 12, 6]
+
+    next_jobs = churn(jobs, 0.2)
+    stub.set_jobs(next_jobs)
+    new_jobs = get_new_jobs(collect=False)
+    assert [job["url"] for chunk in new_jobs.chunks(4) for job in chunk] == [job["url"] for job in next_jobs[-6:]]